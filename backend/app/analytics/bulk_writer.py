@@ -0,0 +1,64 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+import time
+
+def print_write_rate(label: str, rows: int, seconds: float):
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"{label}: {rows:,} rânduri scrise în {seconds:.2f}s ({rate:,.0f} rânduri/s)")
+
+class BulkWriter:
+    """Collects per-row column changes and writes them back in committed chunks.
+
+    Rows handed to ``assign`` are expected to be detached from the session
+    (or plain row objects), so nothing goes through the unit of work: each
+    ``flush`` issues one executemany UPDATE by primary key per chunk and
+    commits it, so an interrupted run keeps every chunk already written.
+    """
+
+    def __init__(self, db: Session, model=CarListing, chunk_size: int = 5000, label: str = "Bulk update", verbose: bool = True):
+        self.db = db
+        self.model = model
+        self.chunk_size = chunk_size
+        self.label = label
+        self.verbose = verbose
+        self.pending = {}
+        self.rows_written = 0
+        self.seconds = 0.0
+
+    def set(self, row_id: int, **changes):
+        self.pending.setdefault(row_id, {}).update(changes)
+
+    def assign(self, row, **changes):
+        changed = {column: value for column, value in changes.items() if getattr(row, column) != value}
+        for column, value in changed.items():
+            setattr(row, column, value)
+        if changed:
+            self.set(row.id, **changed)
+
+    def flush(self) -> int:
+        if not self.pending:
+            return 0
+
+        mappings = [{"id": row_id, **changes} for row_id, changes in self.pending.items()]
+        self.pending = {}
+
+        started = time.perf_counter()
+        for i in range(0, len(mappings), self.chunk_size):
+            chunk = mappings[i:i + self.chunk_size]
+            try:
+                self.db.execute(update(self.model), chunk)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+        elapsed = time.perf_counter() - started
+
+        self.rows_written += len(mappings)
+        self.seconds += elapsed
+        if self.verbose:
+            print_write_rate(self.label, len(mappings), elapsed)
+        return len(mappings)
+
+    def rows_per_second(self) -> float:
+        return self.rows_written / self.seconds if self.seconds > 0 else 0.0
@@ -0,0 +1,186 @@
+from collections import defaultdict
+import random
+import statistics
+import numpy as np
+from app.database import SessionLocal
+from app.models.models import CarListing
+
+BLOCK_CELLS = 2_000_000
+
+def calculate_deal_rating(price: float, estimated_price: float) -> str:
+    price_diff_percentage = ((price - estimated_price) / estimated_price) * 100
+
+    if price_diff_percentage <= -35:
+        return "S"
+    elif -35 < price_diff_percentage <= -15:
+        return "A"
+    elif -15 < price_diff_percentage <= -5:
+        return "B"
+    elif -5 < price_diff_percentage <= 5:
+        return "C"
+    elif 5 < price_diff_percentage <= 15:
+        return "D"
+    elif 15 < price_diff_percentage <= 30:
+        return "E"
+    return "F"
+
+def needs_estimate(car) -> bool:
+    if car.suspicious_price == True or car.damaged == True:
+        return False
+    return bool(
+        car.price and car.year and car.mileage and car.engine_capacity
+        and car.fuel_type and car.transmission and car.drive_type
+    )
+
+def is_estimate_comparable(car) -> bool:
+    if car.suspicious_price == True or car.damaged == True:
+        return False
+    if car.price is None or car.price <= 1000:
+        return False
+    return car.engine_capacity is not None and car.mileage is not None and car.year is not None
+
+def _partition_key(car, generation):
+    return (car.brand, car.model, car.fuel_type, car.transmission, generation)
+
+def _as_float(value):
+    return np.nan if value is None else float(value)
+
+def _rhd_code(value):
+    return np.nan if value is None else float(bool(value))
+
+class _Partition:
+    def __init__(self, cars):
+        self.ids = np.array([car.id for car in cars], dtype=np.int64)
+        self.price = np.array([car.price for car in cars], dtype=np.float64)
+        self.year = np.array([car.year for car in cars], dtype=np.float64)
+        self.mileage = np.array([car.mileage for car in cars], dtype=np.float64)
+        self.engine_capacity = np.array([car.engine_capacity for car in cars], dtype=np.float64)
+        self.engine_power = np.array([_as_float(car.engine_power) for car in cars], dtype=np.float64)
+        self.right_hand_drive = np.array([_rhd_code(car.right_hand_drive) for car in cars], dtype=np.float64)
+
+    def medians(self, targets, min_count: int):
+        """Median comparable price for each target car, or None where fewer than ``min_count`` match."""
+        q_ids = np.array([car.id for car in targets], dtype=np.int64)[:, None]
+        q_year = np.array([car.year for car in targets], dtype=np.float64)[:, None]
+        q_mileage = np.array([car.mileage for car in targets], dtype=np.float64)[:, None]
+        q_capacity = np.array([car.engine_capacity for car in targets], dtype=np.float64)[:, None]
+        q_power = np.array([car.engine_power or 0 for car in targets], dtype=np.float64)[:, None]
+        q_rhd = np.array([_rhd_code(car.right_hand_drive) for car in targets], dtype=np.float64)[:, None]
+
+        mask = (
+            (self.ids != q_ids)
+            & (self.engine_capacity >= q_capacity - 50) & (self.engine_capacity <= q_capacity + 50)
+            & (self.mileage >= q_mileage - 10000) & (self.mileage <= q_mileage + 10000)
+            & (self.year >= q_year - 1) & (self.year <= q_year + 1)
+            & ((q_power == 0) | ((self.engine_power >= q_power - 20) & (self.engine_power <= q_power + 20)))
+            & (np.isnan(q_rhd) | (self.right_hand_drive == q_rhd))
+        )
+
+        counts = mask.sum(axis=1)
+        ordered = np.sort(np.where(mask, self.price, np.inf), axis=1)
+
+        results = []
+        for row, count in enumerate(counts.tolist()):
+            if count < min_count:
+                results.append(None)
+                continue
+            mid = count // 2
+            if count % 2:
+                results.append(float(ordered[row, mid]))
+            else:
+                results.append((float(ordered[row, mid - 1]) + float(ordered[row, mid])) / 2)
+        return results
+
+def estimate_comparable_prices(cars, min_count: int = 4) -> dict:
+    """Pass 2 estimator over an in-memory snapshot: car id -> (estimated_price, deal_rating).
+
+    Listings are partitioned on the exact-match keys (brand, model, fuel type,
+    transmission, generation); the numeric ranges, the right-hand-drive match
+    and the self-exclusion are then evaluated with NumPy broadcasting inside
+    each partition. Matches the per-car query in ``query_comparable_prices``.
+    """
+    candidates = defaultdict(list)
+    targets = defaultdict(list)
+    for car in cars:
+        if is_estimate_comparable(car):
+            candidates[_partition_key(car, car.generation)].append(car)
+        if needs_estimate(car):
+            # A listing without generation is compared against generation IS NULL
+            targets[_partition_key(car, car.generation or None)].append(car)
+
+    estimates = {}
+    for key, partition_targets in targets.items():
+        partition_candidates = candidates.get(key)
+        if not partition_candidates or len(partition_candidates) < min_count:
+            continue
+
+        partition = _Partition(partition_candidates)
+        block = max(1, BLOCK_CELLS // len(partition_candidates))
+        for start in range(0, len(partition_targets), block):
+            chunk = partition_targets[start:start + block]
+            for car, median_price in zip(chunk, partition.medians(chunk, min_count)):
+                if median_price is None:
+                    continue
+                estimated_price = round(median_price, 2)
+                estimates[car.id] = (estimated_price, calculate_deal_rating(car.price, estimated_price))
+
+    return estimates
+
+def query_comparable_prices(db, car) -> list:
+    """Reference per-car query used by Pass 2 before the batch estimator."""
+    filters = [
+        CarListing.id != car.id,
+        CarListing.brand == car.brand,
+        CarListing.model == car.model,
+        CarListing.fuel_type == car.fuel_type,
+        CarListing.transmission == car.transmission,
+        CarListing.engine_capacity.between(car.engine_capacity - 50, car.engine_capacity + 50) if car.engine_capacity else True,
+        CarListing.engine_power.between(car.engine_power - 20, car.engine_power + 20) if car.engine_power else True,
+        CarListing.mileage.between(car.mileage - 10000, car.mileage + 10000) if car.mileage else True,
+        CarListing.year.between(car.year - 1, car.year + 1) if car.year else True,
+        (CarListing.damaged != True) | (CarListing.damaged == None),
+        (CarListing.suspicious_price != True) | (CarListing.suspicious_price == None),
+        CarListing.price > 1000
+    ]
+
+    if car.right_hand_drive is not None:
+        filters.append(CarListing.right_hand_drive == car.right_hand_drive)
+
+    if car.generation:
+        filters.append(CarListing.generation == car.generation)
+    else:
+        filters.append(CarListing.generation == None)
+
+    similar_cars = db.query(CarListing).filter(*filters).all()
+    return [c.price for c in similar_cars if c.price and c.price > 0]
+
+def check_estimator_parity(sample_size: int = 2000, seed: int = 0) -> int:
+    """Compare the batch estimator with the per-car query on a sample of cars. Returns the mismatch count."""
+    db = SessionLocal()
+    try:
+        cars = db.query(CarListing).all()
+        estimates = estimate_comparable_prices(cars)
+
+        sample = [car for car in cars if needs_estimate(car)]
+        random.Random(seed).shuffle(sample)
+        sample = sample[:sample_size]
+
+        mismatches = 0
+        for car in sample:
+            prices = query_comparable_prices(db, car)
+            expected = None
+            if len(prices) >= 4:
+                estimated_price = round(statistics.median(prices), 2)
+                expected = (estimated_price, calculate_deal_rating(car.price, estimated_price))
+
+            if estimates.get(car.id) != expected:
+                mismatches += 1
+                print(f"Diferență pentru car ID {car.id}: batch={estimates.get(car.id)} query={expected}")
+
+        print(f"Verificate {len(sample)} mașini, {mismatches} diferențe")
+        return mismatches
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    check_estimator_parity()
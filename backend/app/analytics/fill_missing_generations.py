@@ -1,44 +1,63 @@
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.models import CarListing
+from app.analytics.bulk_writer import BulkWriter
+from app.crud.data_version_crud import bump_data_version
+from app.analytics.generation_spans import GenerationSpanIndex, labelled_generation_counts, normalize_model
 from tqdm import tqdm
+from collections import defaultdict
 
-def normalize_model(model: str) -> str:
-    if not model:
-        return ""
-    model = model.lower()
-    model = model.replace("class", "")
-    model = model.replace("seria", "")
-    model = model.replace("series", "")
-    model = model.replace("-", " ")
-    model = model.strip()
-    return model
-
-def assign_missing_generations():
+def build_generation_index(counts) -> dict:
+    """Map (brand, normalize_model(model), year) to the most frequent generation among labelled listings.
+
+    Ties go to the generation seen first in id order.
+    """
+    generations = defaultdict(dict)
+    for brand, model, year, generation, count, first_id in counts:
+        key = (brand, normalize_model(model), year)
+        total, seen_first = generations[key].get(generation, (0, first_id))
+        generations[key][generation] = (total + count, min(seen_first, first_id))
+
+    return {
+        key: min(candidates, key=lambda generation: (-candidates[generation][0], candidates[generation][1]))
+        for key, candidates in generations.items()
+    }
+
+def assign_missing_generations() -> int:
     db: Session = SessionLocal()
-    cars_to_update = db.query(CarListing).filter(CarListing.generation == None).all()
+    counts = labelled_generation_counts(db)
+    index = build_generation_index(counts)
+    spans = GenerationSpanIndex(counts)
+    cars_to_update = db.query(CarListing.id, CarListing.brand, CarListing.model, CarListing.year).filter(
+        CarListing.generation == None
+    ).all()
     print(f"{len(cars_to_update)} mașini fără generație.")
 
+    writer = BulkWriter(db, label="Generații")
+
     updated_count = 0
+    from_spans = 0
+    normalized = {}
 
     for car in tqdm(cars_to_update, desc="Actualizare generații"):
-        norm_model = normalize_model(car.model)
-        possible_matches = db.query(CarListing).filter(
-            CarListing.id != car.id,
-            CarListing.brand == car.brand,
-            CarListing.generation != None,
-            CarListing.year == car.year
-        ).all()
-
-        for match in possible_matches:
-            if normalize_model(match.model) == norm_model:
-                car.generation = match.generation
-                updated_count += 1
-                break
-
-    db.commit()
+        if car.model not in normalized:
+            normalized[car.model] = normalize_model(car.model)
+        generation = index.get((car.brand, normalized[car.model], car.year))
+        if generation is None:
+            generation = spans.lookup(car.brand, car.model, car.year)
+            if generation is not None:
+                from_spans += 1
+        if generation is not None:
+            writer.set(car.id, generation=generation)
+            updated_count += 1
+
+    writer.flush()
+    if updated_count:
+        bump_data_version(db)
+        db.commit()
     db.close()
-    print(f"Actualizate {updated_count} mașini cu generație.")
+    print(f"Actualizate {updated_count} mașini cu generație ({from_spans} din intervalele de producție).")
+    return updated_count
 
 if __name__ == "__main__":
     assign_missing_generations()
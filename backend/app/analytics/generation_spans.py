@@ -0,0 +1,92 @@
+from bisect import bisect_right
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+
+# Years holding less than this share of a generation's listings are treated as
+# mislabels and do not stretch its production span.
+MIN_YEAR_SHARE = 0.02
+
+def normalize_model(model: str) -> str:
+    if not model:
+        return ""
+    model = model.lower()
+    model = model.replace("class", "")
+    model = model.replace("seria", "")
+    model = model.replace("series", "")
+    model = model.replace("-", " ")
+    model = model.strip()
+    return model
+
+def labelled_generation_counts(db: Session) -> list:
+    """(brand, model, year, generation, listing count, lowest id) for every labelled combination."""
+    return db.query(
+        CarListing.brand,
+        CarListing.model,
+        CarListing.year,
+        CarListing.generation,
+        func.count(CarListing.id),
+        func.min(CarListing.id)
+    ).filter(
+        CarListing.generation != None
+    ).group_by(
+        CarListing.brand, CarListing.model, CarListing.year, CarListing.generation
+    ).all()
+
+class YearIntervals:
+    """Generation production spans of one model, answering "which generation covers year Y" by bisection.
+
+    The span endpoints cut the year axis into elementary intervals; each one
+    stores the most frequent generation among the spans covering it, so
+    overlaps are resolved once at build time and a lookup is O(log n).
+    """
+
+    def __init__(self, spans):
+        # spans: (first_year, last_year, generation, listing_count)
+        self.spans = sorted(spans)
+        bounds = sorted({span[0] for span in self.spans} | {span[1] + 1 for span in self.spans})
+
+        self.starts = []
+        self.generations = []
+        for start in bounds:
+            covering = [span for span in self.spans if span[0] <= start <= span[1]]
+            winner = None
+            if covering:
+                # Most listings first, then the older span, then the name.
+                winner = min(covering, key=lambda span: (-span[3], span[0], span[2]))[2]
+            if self.generations and self.generations[-1] == winner:
+                continue
+            self.starts.append(start)
+            self.generations.append(winner)
+
+    def covering(self, year):
+        if year is None:
+            return None
+        i = bisect_right(self.starts, year) - 1
+        return self.generations[i] if i >= 0 else None
+
+class GenerationSpanIndex:
+    """Per (brand, normalized model) year-interval index of generations, built from labelled listings."""
+
+    def __init__(self, counts):
+        years = defaultdict(lambda: defaultdict(int))
+        for brand, model, year, generation, count, _ in counts:
+            if year is not None and generation:
+                years[(brand, normalize_model(model), generation)][year] += count
+
+        spans = defaultdict(list)
+        for (brand, model, generation), by_year in years.items():
+            total = sum(by_year.values())
+            kept = [year for year, count in by_year.items() if count >= total * MIN_YEAR_SHARE]
+            kept.append(max(by_year, key=by_year.get))
+            spans[(brand, model)].append((min(kept), max(kept), generation, total))
+
+        self.models = {key: YearIntervals(model_spans) for key, model_spans in spans.items()}
+
+    def lookup(self, brand, model, year):
+        intervals = self.models.get((brand, normalize_model(model)))
+        return intervals.covering(year) if intervals else None
+
+def load_generation_spans(db: Session) -> GenerationSpanIndex:
+    return GenerationSpanIndex(labelled_generation_counts(db))
@@ -0,0 +1,64 @@
+from datetime import datetime
+import json
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+from app.models.models import CarListing, ModelStatsRollup
+from app.crud.model_stats_crud import get_model_stats, included_listings
+from app.analytics.rating_rows import find_dirty_cohorts
+
+# Models with more listings than this get a rollup; rarer ones are aggregated live.
+MODEL_STATS_ROLLUP_MIN_LISTINGS = 50
+
+def rollup_models(db: Session, pairs: list, min_listings: int) -> list:
+    """The (brand, model) pairs among ``pairs`` with more than ``min_listings`` listings in their stats."""
+    models = []
+    for i in range(0, len(pairs), 500):
+        rows = db.query(CarListing.brand, CarListing.model).filter(
+            tuple_(CarListing.brand, CarListing.model).in_(pairs[i:i + 500]),
+            *included_listings()
+        ).group_by(CarListing.brand, CarListing.model).having(func.count() > min_listings).all()
+        models.extend((brand, model) for brand, model in rows)
+    return models
+
+def refresh_model_stats_rollups(db: Session, cohorts: list, refreshed_at: datetime, min_listings: int = MODEL_STATS_ROLLUP_MIN_LISTINGS) -> int:
+    """Replace the model_stats_rollup rows of the given (brand, model) cohorts.
+
+    Each row holds the /cars/model-stats response as JSON; cohorts at or
+    below ``min_listings`` lose their row and are served live.
+    """
+    pairs = [pair for pair in cohorts if pair[0] is not None and pair[1] is not None]
+    rows = []
+    for brand, model in rollup_models(db, pairs, min_listings):
+        stats = get_model_stats(db, brand, model)
+        rows.append({
+            "brand": brand,
+            "model": model,
+            "listing_count": stats["totalCount"],
+            "stats": json.dumps(stats, ensure_ascii=False, separators=(",", ":")),
+            "refreshed_at": refreshed_at
+        })
+
+    try:
+        for i in range(0, len(pairs), 500):
+            db.query(ModelStatsRollup).filter(
+                tuple_(ModelStatsRollup.brand, ModelStatsRollup.model).in_(pairs[i:i + 500])
+            ).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(ModelStatsRollup.__table__), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(rows)
+
+def refresh_changed_model_stats_rollups(db: Session, since: datetime) -> int:
+    """Refresh the rollups of models with listings added, repriced or sold since ``since``; used by the spiders."""
+    return refresh_model_stats_rollups(db, list(find_dirty_cohorts(db, since)), datetime.utcnow())
+
+def delete_stale_model_stats_rollups(db: Session, refreshed_before: datetime) -> int:
+    deleted = db.query(ModelStatsRollup).filter(
+        ModelStatsRollup.refreshed_at < refreshed_before
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
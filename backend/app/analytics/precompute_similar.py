@@ -0,0 +1,66 @@
+from datetime import datetime
+import json
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import CarListing, SimilarListings
+from app.crud.similarity_index import ModelNeighbours, PRECOMPUTED_SIMILAR, load_model_rows, similar_candidates
+from tqdm import tqdm
+
+def similar_lists(group: ModelNeighbours, k: int = PRECOMPUTED_SIMILAR) -> dict:
+    """car id -> ids of its ``k`` nearest neighbours within the group, as ModelNeighbours.nearest ranks them."""
+    if not len(group):
+        return {}
+    _, positions = group.tree.query(group.vectors, k=min(k + 1, len(group)))
+    positions = positions.reshape(len(group), -1)
+    lists = {}
+    for car_id, row in zip(group.ids.tolist(), group.ids[positions].tolist()):
+        lists[car_id] = [similar_id for similar_id in row if similar_id != car_id][:k]
+    return lists
+
+def refresh_similar_listings(db: Session, brand: str, model: str, refreshed_at: datetime) -> int:
+    lists = similar_lists(ModelNeighbours(load_model_rows(db, brand, model)))
+    rows = [
+        {"car_id": car_id, "similar_ids": json.dumps(similar_ids), "refreshed_at": refreshed_at}
+        for car_id, similar_ids in lists.items()
+    ]
+    car_ids = list(lists)
+    try:
+        for i in range(0, len(car_ids), 1000):
+            db.query(SimilarListings).filter(
+                SimilarListings.car_id.in_(car_ids[i:i + 1000])
+            ).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(SimilarListings.__table__), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+def precompute_similar_listings() -> int:
+    """Store the PRECOMPUTED_SIMILAR most similar listings of every candidate listing.
+
+    Listings that are no longer candidates (sold, flagged or deleted) lose
+    their row; /cars/{car_id}/similar falls back to the in-memory index for them.
+    """
+    db = SessionLocal()
+    refreshed_at = datetime.utcnow()
+    models = db.query(CarListing.brand, CarListing.model).filter(
+        CarListing.brand != None, CarListing.model != None, *similar_candidates()
+    ).distinct().all()
+
+    stored = 0
+    for brand, model in tqdm(models, desc="Liste de anunțuri similare"):
+        stored += refresh_similar_listings(db, brand, model, refreshed_at)
+
+    deleted = db.query(SimilarListings).filter(
+        SimilarListings.refreshed_at < refreshed_at
+    ).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+    print(f"Salvate liste de anunțuri similare pentru {stored} mașini ({len(models)} modele), {deleted} liste vechi șterse.")
+    return stored
+
+if __name__ == "__main__":
+    precompute_similar_listings()
@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+def is_outlier_comparable(car) -> bool:
+    if car.suspicious_price == True or car.damaged == True:
+        return False
+    if not car.brand or not car.model or car.year is None or car.price is None:
+        return False
+    return 1000 < car.price < 200000
+
+class PriceCohorts:
+    """Year-sorted comparable prices per (brand, model), built from one snapshot of the table.
+
+    Mirrors the Pass 1 comparable query: same brand and model, year within
+    ``year_radius``, 1000 < price < 200000, not damaged and not suspicious.
+    """
+
+    def __init__(self, cars, year_radius: int = 3):
+        self.year_radius = year_radius
+        self._member_ids = set()
+        self._windows = {}
+
+        grouped = defaultdict(list)
+        for car in cars:
+            if is_outlier_comparable(car):
+                grouped[(car.brand, car.model)].append((car.year, car.price))
+                self._member_ids.add(car.id)
+
+        self._groups = {}
+        for key, pairs in grouped.items():
+            pairs.sort()
+            self._groups[key] = ([year for year, _ in pairs], [price for _, price in pairs])
+
+    def window_prices(self, brand: str, model: str, year: int) -> list:
+        key = (brand, model, year)
+        if key not in self._windows:
+            group = self._groups.get((brand, model))
+            if group is None:
+                self._windows[key] = []
+            else:
+                years, prices = group
+                lo = bisect_left(years, year - self.year_radius)
+                hi = bisect_right(years, year + self.year_radius)
+                self._windows[key] = sorted(prices[lo:hi])
+        return self._windows[key]
+
+    def median_for(self, car, min_count: int = 5):
+        """Median price of the car's comparables (the car itself excluded), or None below ``min_count``."""
+        prices = self.window_prices(car.brand, car.model, car.year)
+        skip = None
+        if car.id in self._member_ids:
+            skip = bisect_left(prices, car.price)
+
+        count = len(prices) - (1 if skip is not None else 0)
+        if count < min_count:
+            return None
+
+        def at(index):
+            if skip is not None and index >= skip:
+                return prices[index + 1]
+            return prices[index]
+
+        mid = count // 2
+        if count % 2:
+            return at(mid)
+        return (at(mid - 1) + at(mid)) / 2
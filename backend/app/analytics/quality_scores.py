@@ -0,0 +1,88 @@
+from datetime import datetime
+import numpy as np
+from app.database import SessionLocal
+from app.models.models import CarListing
+
+DEAL_RATING_POINTS = {"S": 10, "A": 7, "B": 5, "D": -5, "E": -7, "F": -10}
+
+def _as_float(value):
+    return np.nan if value is None else float(value)
+
+def _is_true(cars, column):
+    return np.array([getattr(car, column) == True for car in cars], dtype=bool)
+
+def quality_scores(cars, current_year: int):
+    """Vectorized calculate_quality_score over ``cars``.
+
+    Returns (scores, valid): the reference raises for a car without a year,
+    so those rows are reported through ``valid`` instead of getting a score.
+    """
+    year = np.array([_as_float(car.year) for car in cars], dtype=np.float64)
+    mileage = np.array([_as_float(car.mileage) for car in cars], dtype=np.float64)
+    valid = ~np.isnan(year)
+
+    # NaN compares False everywhere, so a missing mileage adds nothing.
+    score = np.full(len(cars), 50, dtype=np.int64)
+    score += np.select(
+        [mileage < 10000, mileage < 50000, mileage < 100000, mileage > 200000],
+        [15, 10, 5, -5],
+        0
+    )
+
+    car_age = current_year - year
+    with np.errstate(invalid="ignore"):
+        avg_yearly_mileage = mileage / np.maximum(1, car_age)
+    score += np.select(
+        [avg_yearly_mileage < 10000, avg_yearly_mileage < 15000, avg_yearly_mileage > 25000],
+        [10, 5, -5],
+        0
+    )
+
+    score += np.select(
+        [car_age < 3, car_age < 5, car_age < 7, car_age < 10, car_age < 15],
+        [10, 8, 6, 4, 2],
+        0
+    )
+
+    score += 15 * _is_true(cars, "service_book")
+    score += 15 * _is_true(cars, "no_accident")
+    score += 10 * _is_true(cars, "first_owner")
+    score += 5 * _is_true(cars, "registered")
+    score -= 15 * _is_true(cars, "right_hand_drive")
+
+    automatic = {}
+    for car in cars:
+        if car.transmission not in automatic:
+            automatic[car.transmission] = bool(car.transmission and "automatic" in car.transmission.lower())
+    score += 10 * np.array([automatic[car.transmission] for car in cars], dtype=bool)
+
+    score += np.array([DEAL_RATING_POINTS.get(car.deal_rating, 0) for car in cars], dtype=np.int64)
+
+    return np.clip(score, 0, 100), valid
+
+def check_quality_score_parity() -> int:
+    """Compare the vectorized scores with calculate_quality_score on every listing. Returns the mismatch count."""
+    from app.analytics.update_deal_ratings import calculate_quality_score
+
+    db = SessionLocal()
+    try:
+        cars = db.query(CarListing).all()
+        scores, valid = quality_scores(cars, datetime.now().year)
+
+        mismatches = 0
+        for car, score, ok in zip(cars, scores.tolist(), valid.tolist()):
+            try:
+                expected = calculate_quality_score(car)
+            except Exception:
+                expected = None
+            if (score if ok else None) != expected:
+                mismatches += 1
+                print(f"Diferență pentru car ID {car.id}: vectorizat={score if ok else None} referință={expected}")
+
+        print(f"Verificate {len(cars)} mașini, {mismatches} diferențe")
+        return mismatches
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    check_quality_score_parity()
@@ -0,0 +1,79 @@
+import sys
+from sqlalchemy import and_, func, or_, tuple_
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+from datetime import datetime
+
+RATING_COLUMNS = (
+    "id", "brand", "model", "price", "year", "mileage", "fuel_type", "transmission",
+    "engine_capacity", "engine_power", "drive_type", "generation", "right_hand_drive",
+    "damaged", "suspicious_price", "estimated_price", "deal_rating", "quality_score",
+    "service_book", "no_accident", "first_owner", "registered"
+)
+
+INTERNED_COLUMNS = ("brand", "model", "fuel_type", "transmission", "drive_type", "generation", "deal_rating")
+
+class RatingRow:
+    """The subset of a CarListing the rating passes read and write, without the text blobs."""
+
+    __slots__ = RATING_COLUMNS
+
+    def __init__(self, values):
+        for name, value in zip(RATING_COLUMNS, values):
+            if value is not None and name in INTERNED_COLUMNS:
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+def cohort_sizes(db: Session) -> dict:
+    rows = db.query(CarListing.brand, CarListing.model, func.count(CarListing.id)).group_by(
+        CarListing.brand, CarListing.model
+    ).all()
+    return {(brand, model): count for brand, model, count in rows}
+
+def find_dirty_cohorts(db: Session, since: datetime) -> set:
+    """(brand, model) cohorts touched by new listings, price changes or sold flips since ``since``.
+
+    The spiders reset created_at whenever they append to price_history, so
+    created_at covers both new rows and repriced ones.
+    """
+    rows = db.query(CarListing.brand, CarListing.model).filter(
+        (CarListing.created_at > since) | (CarListing.sold_detected_at > since),
+        CarListing.brand != None,
+        CarListing.model != None
+    ).distinct().all()
+    return {(brand, model) for brand, model in rows}
+
+def plan_cohort_batches(sizes: dict, min_rows: int = 50000) -> list:
+    """Pack whole (brand, model) cohorts into batches of roughly ``min_rows`` rows."""
+    batches = []
+    batch = []
+    batch_rows = 0
+    for key in sorted(sizes, key=lambda pair: (pair[0] or "", pair[1] or "")):
+        batch.append(key)
+        batch_rows += sizes[key]
+        if batch_rows >= min_rows:
+            batches.append(batch)
+            batch = []
+            batch_rows = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+def cohort_filter(cohorts: list):
+    """Filter matching every listing of the given (brand, model) cohorts, NULL brand or model included."""
+    pairs = [pair for pair in cohorts if pair[0] is not None and pair[1] is not None]
+    conditions = [
+        and_(CarListing.brand == brand, CarListing.model == model)
+        for brand, model in cohorts
+        if brand is None or model is None
+    ]
+    if pairs:
+        conditions.append(tuple_(CarListing.brand, CarListing.model).in_(pairs))
+    return or_(*conditions)
+
+def stream_rating_rows(db: Session, *criteria, batch_size: int = 10000):
+    """Yield RatingRows for the matching listings, fetched ``batch_size`` at a time through a server-side cursor."""
+    columns = [getattr(CarListing, name) for name in RATING_COLUMNS]
+    query = db.query(*columns).filter(*criteria).execution_options(yield_per=batch_size)
+    for values in query:
+        yield RatingRow(values)
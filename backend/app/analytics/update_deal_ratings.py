@@ -1,9 +1,22 @@
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, engine
 from app.models.models import CarListing
+from app.analytics.price_cohorts import PriceCohorts
+from app.analytics.comparables import estimate_comparable_prices
+from app.analytics.quality_scores import quality_scores
+from app.analytics.bulk_writer import BulkWriter, print_write_rate
+from app.crud.data_version_crud import bump_data_version
+from app.analytics.model_stats_rollup import refresh_model_stats_rollups, delete_stale_model_stats_rollups
+from app.analytics.rating_rows import cohort_sizes, find_dirty_cohorts, plan_cohort_batches, cohort_filter, stream_rating_rows
 from tqdm import tqdm # type: ignore
-import statistics
 from datetime import datetime
+import argparse
+import concurrent.futures
+import os
+import time
+
+last_run_file = os.path.join(os.path.dirname(__file__), "last_rating_run.txt")
+COHORT_BATCH_ROWS = 50000
 
 def is_suspicious_price_heuristic(car):
     placeholder_prices = [1, 123, 1111, 1234]
@@ -103,190 +116,265 @@ def calculate_quality_score(car):
     
     return max(0, min(max_score, score))
 
-def update_deal_ratings():
-    db = SessionLocal()
-    cars = db.query(CarListing).all()
-    total = len(cars)
-    
-    print(f"Începe procesarea pentru {total} mașini cu algoritmul îmbunătățit...")
+def load_last_run():
+    if os.path.exists(last_run_file):
+        with open(last_run_file, "r") as f:
+            try:
+                return datetime.fromisoformat(f.read().strip())
+            except ValueError:
+                print("Eroare la citirea last_rating_run.txt, se face recalculare completă")
+                return None
+    return None
 
+def save_last_run(run_started_at: datetime):
+    with open(last_run_file, "w") as f:
+        f.write(run_started_at.isoformat())
+
+def rate_listings(writer: BulkWriter, cars: list) -> dict:
+    """Run the five rating passes over ``cars`` and write the changes through ``writer``.
+
+    Every comparable lookup is scoped to brand and model, so ``cars`` must
+    contain whole (brand, model) cohorts for the results to match a full run.
+    """
+    timer = time.perf_counter()
     flagged_obvious = 0
     
-    for car in tqdm(cars, desc="Pass 0 - Flag placeholder prices"):
+    for car in cars:
         if car.price and (car.price in [1, 123, 1111, 1234] or car.price < 100):
-            car.suspicious_price = True
+            writer.assign(car, suspicious_price=True)
             flagged_obvious += 1
-    
-    db.commit()
-    print(f"Pass 0 completat: {flagged_obvious} prețuri placeholder detectate")
 
+    pass0_seconds = time.perf_counter() - timer
+    timer = time.perf_counter()
     flagged_outliers = 0
-    errors = 0
+    pass1_errors = 0
+    cohorts = PriceCohorts(cars, year_radius=3)
     
-    for car in tqdm(cars, desc="Pass 1 - Detect extreme outliers"):
+    for car in cars:
         try:
             if car.suspicious_price == True or not car.price:
                 continue
             
             if is_suspicious_price_heuristic(car):
-                car.suspicious_price = True
+                writer.assign(car, suspicious_price=True)
                 flagged_outliers += 1
                 continue
             
             if not car.year or not car.brand or not car.model:
                 continue
                 
-            similar_cars = db.query(CarListing).filter(
-                CarListing.id != car.id,
-                CarListing.brand == car.brand,
-                CarListing.model == car.model,
-                CarListing.year.between(car.year - 3, car.year + 3),
-                CarListing.price > 1000,
-                CarListing.price < 200000,
-                (CarListing.damaged != True) | (CarListing.damaged == None),
-                (CarListing.suspicious_price != True) | (CarListing.suspicious_price == None)
-            ).all()
+            median_price = cohorts.median_for(car, min_count=5)
             
-            if len(similar_cars) >= 5:
-                prices = [c.price for c in similar_cars if c.price and c.price > 0]
-                if len(prices) >= 5:
-                    median_price = statistics.median(prices)
-                    
-                    if car.price < median_price * 0.15 or car.price > median_price * 6:
-                        car.suspicious_price = True
-                        flagged_outliers += 1
+            if median_price is not None:
+                if car.price < median_price * 0.15 or car.price > median_price * 6:
+                    writer.assign(car, suspicious_price=True)
+                    flagged_outliers += 1
                         
         except Exception as e:
             print(f"Error în Pass 1 pentru car ID {car.id}: {str(e)}")
-            errors += 1
-    
-    db.commit()
-    print(f"Pass 1 completat: {flagged_outliers} outliers detectați, {errors} erori")
+            pass1_errors += 1
     
+    pass1_seconds = time.perf_counter() - timer
+    timer = time.perf_counter()
     estimated_updated = 0
-    errors = 0
+    pass2_errors = 0
+    
+    estimates = estimate_comparable_prices(cars)
     
-    for car in tqdm(cars, desc="Pass 2 - Calculate estimated prices"):
+    for car in cars:
         try:
-            if car.suspicious_price == True or car.damaged == True:
-                continue
-                
-            if not car.price or not car.year or not car.mileage or not car.engine_capacity or not car.fuel_type or not car.transmission or not car.drive_type:
-                continue
-
-            filters = [
-                CarListing.id != car.id,
-                CarListing.brand == car.brand,
-                CarListing.model == car.model,
-                CarListing.fuel_type == car.fuel_type,
-                CarListing.transmission == car.transmission,
-                CarListing.engine_capacity.between(car.engine_capacity - 50, car.engine_capacity + 50) if car.engine_capacity else True,
-                CarListing.engine_power.between(car.engine_power - 20, car.engine_power + 20) if car.engine_power else True,
-                CarListing.mileage.between(car.mileage - 10000, car.mileage + 10000) if car.mileage else True,
-                CarListing.year.between(car.year - 1, car.year + 1) if car.year else True,
-                (CarListing.damaged != True) | (CarListing.damaged == None),
-                (CarListing.suspicious_price != True) | (CarListing.suspicious_price == None),
-                CarListing.price > 1000
-            ]
-
-            if car.right_hand_drive is not None:
-                filters.append(CarListing.right_hand_drive == car.right_hand_drive)
-
-            if car.generation:
-                filters.append(CarListing.generation == car.generation)
-            else:
-                filters.append(CarListing.generation == None)
-
-            similar_cars = db.query(CarListing).filter(*filters).all()
-
-            if len(similar_cars) < 4:
+            estimate = estimates.get(car.id)
+            if estimate is None:
                 continue
 
-            prices = [c.price for c in similar_cars if c.price and c.price > 0]
-            if len(prices) < 4:
-                continue
-
-            estimated_price = round(statistics.median(prices), 2)
-            car.estimated_price = estimated_price
-
-            price_diff_percentage = ((car.price - estimated_price) / estimated_price) * 100
-
-            if price_diff_percentage <= -35:
-                car.deal_rating = "S"
-            elif -35 < price_diff_percentage <= -15:
-                car.deal_rating = "A"
-            elif -15 < price_diff_percentage <= -5:
-                car.deal_rating = "B"
-            elif -5 < price_diff_percentage <= 5:
-                car.deal_rating = "C"
-            elif 5 < price_diff_percentage <= 15:
-                car.deal_rating = "D"
-            elif 15 < price_diff_percentage <= 30:
-                car.deal_rating = "E"
-            else:
-                car.deal_rating = "F"
-
+            estimated_price, deal_rating = estimate
+            writer.assign(car, estimated_price=estimated_price, deal_rating=deal_rating)
             estimated_updated += 1
             
         except Exception as e:
             print(f"Error în Pass 2 pentru car ID {car.id}: {str(e)}")
-            errors += 1
-
-    db.commit()
-    print(f"Pass 2 completat: {estimated_updated} estimated prices calculate, {errors} erori")
+            pass2_errors += 1
     
+    pass2_seconds = time.perf_counter() - timer
+    timer = time.perf_counter()
     flagged_final = 0
-    errors = 0
+    pass3_errors = 0
     
-    for car in tqdm(cars, desc="Pass 3 - Final suspicious detection"):
+    for car in cars:
         try:
             if car.suspicious_price == True or not car.estimated_price:
                 continue
                 
             if car.price < (car.estimated_price * 0.12):
-                car.suspicious_price = True
-                car.deal_rating = None
-                car.estimated_price = None
+                writer.assign(car, suspicious_price=True, deal_rating=None, estimated_price=None)
                 flagged_final += 1
                 
         except Exception as e:
             print(f"Error în Pass 3 pentru car ID {car.id}: {str(e)}")
-            errors += 1
-    
-    db.commit()
-    print(f"Pass 3 completat: {flagged_final} prețuri suspicious finale, {errors} erori")
+            pass3_errors += 1
 
+    pass3_seconds = time.perf_counter() - timer
+    timer = time.perf_counter()
     quality_scores_updated = 0
-    errors = 0
+    pass4_errors = 0
     
-    for car in tqdm(cars, desc="Pass 4 - Calculate quality scores"):
-        try:
-            if car.suspicious_price == True or car.damaged == True:
-                continue
-                
-            car.quality_score = calculate_quality_score(car)
-            quality_scores_updated += 1
-            
-        except Exception as e:
-            print(f"Error în Pass 4 pentru car ID {car.id}: {str(e)}")
-            errors += 1
-    
-    db.commit()
+    scored = [car for car in cars if not (car.suspicious_price == True or car.damaged == True)]
+    scores, valid = quality_scores(scored, datetime.now().year)
+
+    for car, score, ok in zip(scored, scores.tolist(), valid.tolist()):
+        if not ok:
+            print(f"Error în Pass 4 pentru car ID {car.id}: an de fabricație lipsă")
+            pass4_errors += 1
+            continue
+
+        writer.assign(car, quality_score=score)
+        quality_scores_updated += 1
+
+    pass4_seconds = time.perf_counter() - timer
+    writer.flush()
+
+    return {
+        "total": len(cars),
+        "estimated_updated": estimated_updated,
+        "quality_scores_updated": quality_scores_updated,
+        "flagged_obvious": flagged_obvious,
+        "flagged_outliers": flagged_outliers,
+        "flagged_final": flagged_final,
+        "pass1_errors": pass1_errors,
+        "pass2_errors": pass2_errors,
+        "pass3_errors": pass3_errors,
+        "pass4_errors": pass4_errors,
+        "pass0_seconds": pass0_seconds,
+        "pass1_seconds": pass1_seconds,
+        "pass2_seconds": pass2_seconds,
+        "pass3_seconds": pass3_seconds,
+        "pass4_seconds": pass4_seconds
+    }
+
+def merge_stats(stats: dict, batch_stats: dict) -> dict:
+    for key, value in batch_stats.items():
+        stats[key] = stats.get(key, 0) + value
+    return stats
+
+def init_rating_worker():
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+
+def rate_cohort_batch(cohorts: list, stats_refreshed_at: datetime) -> dict:
+    """Load, rate and write back one batch of whole (brand, model) cohorts in its own session.
+
+    The model_stats_rollup rows of the batch are rebuilt after rating.
+    """
+    db = SessionLocal()
+    try:
+        writer = BulkWriter(db, label="Deal ratings", verbose=False)
+        timer = time.perf_counter()
+        cars = list(stream_rating_rows(db, cohort_filter(cohorts)))
+        load_seconds = time.perf_counter() - timer
+
+        stats = rate_listings(writer, cars)
+        stats["load_seconds"] = load_seconds
+        stats["rows_written"] = writer.rows_written
+        stats["write_seconds"] = writer.seconds
+
+        # After rating, so the rollups see this run's suspicious_price flags.
+        stats["model_rollups"] = refresh_model_stats_rollups(db, cohorts, stats_refreshed_at)
+        return stats
+    finally:
+        db.close()
+
+def update_deal_ratings(incremental: bool = False, workers: int = 1, checkpoint: bool = True) -> dict:
+    db = SessionLocal()
+    run_started_at = datetime.now()
+    stats_refreshed_at = datetime.utcnow()
+    started = time.perf_counter()
+
+    since = load_last_run() if incremental else None
+    if incremental and since is None:
+        print("Nu există o rulare anterioară, se face recalculare completă")
+
+    sizes = cohort_sizes(db)
+    if since is not None:
+        cohorts = find_dirty_cohorts(db, since)
+        print(f"Mod incremental: {len(cohorts)} cohorte brand/model modificate din {since.isoformat()}")
+        sizes = {key: count for key, count in sizes.items() if key in cohorts}
     db.close()
+
+    total = sum(sizes.values())
+    
+    print(f"Începe procesarea pentru {total} mașini cu algoritmul îmbunătățit...")
+
+    batch_rows = COHORT_BATCH_ROWS
+    if workers > 1:
+        # Smaller batches so every worker stays busy until the end
+        batch_rows = max(1, min(COHORT_BATCH_ROWS, total // (workers * 4)))
+    batches = plan_cohort_batches(sizes, min_rows=batch_rows)
+
+    stats = {}
+    progress = tqdm(total=total, desc="Rating pe cohorte brand/model")
+    try:
+        if workers > 1:
+            print(f"Se folosesc {workers} procese pentru {len(batches)} batch-uri de cohorte")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_rating_worker) as executor:
+                futures = [executor.submit(rate_cohort_batch, batch, stats_refreshed_at) for batch in batches]
+                for future in concurrent.futures.as_completed(futures):
+                    batch_stats = future.result()
+                    merge_stats(stats, batch_stats)
+                    progress.update(batch_stats["total"])
+        else:
+            for batch in batches:
+                batch_stats = rate_cohort_batch(batch, stats_refreshed_at)
+                merge_stats(stats, batch_stats)
+                progress.update(batch_stats["total"])
+    finally:
+        progress.close()
+
+    if since is None:
+        db = SessionLocal()
+        try:
+            delete_stale_model_stats_rollups(db, stats_refreshed_at)
+        finally:
+            db.close()
+
+    db = SessionLocal()
+    try:
+        bump_data_version(db)
+        db.commit()
+    finally:
+        db.close()
+
+    if checkpoint:
+        save_last_run(run_started_at)
+    stats["elapsed_seconds"] = time.perf_counter() - started
+
+    print(f"Pass 0 completat: {stats.get('flagged_obvious', 0)} prețuri placeholder detectate")
+    print(f"Pass 1 completat: {stats.get('flagged_outliers', 0)} outliers detectați, {stats.get('pass1_errors', 0)} erori")
+    print(f"Pass 2 completat: {stats.get('estimated_updated', 0)} estimated prices calculate, {stats.get('pass2_errors', 0)} erori")
+    print(f"Pass 3 completat: {stats.get('flagged_final', 0)} prețuri suspicious finale, {stats.get('pass3_errors', 0)} erori")
+    print(f"Pass 4 completat: {stats.get('quality_scores_updated', 0)} quality scores, {stats.get('pass4_errors', 0)} erori")
+    print_write_rate("Deal ratings", stats.get("rows_written", 0), stats.get("write_seconds", 0.0))
+    print(f"Rollup-uri model_stats_rollup actualizate: {stats.get('model_rollups', 0):,}")
+    print(f"Timp total: {stats['elapsed_seconds']:.1f}s")
     
-    total_suspicious = flagged_obvious + flagged_outliers + flagged_final
+    total_suspicious = stats.get("flagged_obvious", 0) + stats.get("flagged_outliers", 0) + stats.get("flagged_final", 0)
     
     print(f"\n" + "="*60)
     print(f"PROCESARE COMPLETĂ")
     print(f"="*60)
-    print(f"Total mașini procesate: {total:,}")
-    print(f"Estimated prices calculate: {estimated_updated:,}")
-    print(f"Quality scores calculate: {quality_scores_updated:,}")
+    print(f"Total mașini procesate: {stats.get('total', 0):,}")
+    print(f"Estimated prices calculate: {stats.get('estimated_updated', 0):,}")
+    print(f"Quality scores calculate: {stats.get('quality_scores_updated', 0):,}")
     print(f"Total suspicious detectate: {total_suspicious:,}")
-    print(f"  - Placeholder prices: {flagged_obvious:,}")
-    print(f"  - Extreme outliers: {flagged_outliers:,}")
-    print(f"  - Final detection: {flagged_final:,}")
+    print(f"  - Placeholder prices: {stats.get('flagged_obvious', 0):,}")
+    print(f"  - Extreme outliers: {stats.get('flagged_outliers', 0):,}")
+    print(f"  - Final detection: {stats.get('flagged_final', 0):,}")
     print(f"="*60)
 
+    return stats
+
 if __name__ == "__main__":
-    update_deal_ratings()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true", help="recalculează doar cohortele brand/model modificate de la ultima rulare")
+    parser.add_argument("--workers", type=int, default=1, help="numărul de procese pentru rating-ul pe cohorte")
+    args = parser.parse_args()
+    update_deal_ratings(incremental=args.incremental, workers=args.workers)
@@ -0,0 +1,24 @@
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import os
+from app.database import DATABASE_URL
+from app.db_pool import engine_options
+
+# Async engine for the API routes. Only the API imports this module, so the
+# spiders and batch scripts keep the sync engine of app.database and do not
+# need an async driver installed.
+
+# Async driver for each sync backend; ASYNC_DATABASE_URL overrides the derived URL
+# (e.g. when the sync URL carries psycopg2-only query options).
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+# Its own pool profile, so the sync and async engines together stay within an API worker's budget.
+ASYNC_DB_PROFILE = "api_async"
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, ASYNC_DB_PROFILE, async_driver=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from app.dependencies import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_async_db
 from app.models.models import User
 from app.auth.schemas import LoginRequest, RegisterRequest, TokenResponse, UserOut
 from app.auth.utils import (
@@ -12,8 +14,8 @@ from app.auth.utils import (
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login", response_model=TokenResponse)
-def login_user(login: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == login.email).first()
+async def login_user(login: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter(User.email == login.email))).scalars().first()
 
     if not user:
         raise HTTPException(
@@ -22,7 +24,8 @@ def login_user(login: LoginRequest, db: Session = Depends(get_db)):
         )
 
     try:
-        if not verify_password(login.password, user.password):
+        # bcrypt is deliberately slow; keep it off the event loop.
+        if not await run_in_threadpool(verify_password, login.password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -42,20 +45,20 @@ def login_user(login: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/register", response_model=TokenResponse)
-def register_user(register: RegisterRequest, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == register.email).first()
+async def register_user(register: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    existing_user = (await db.execute(select(User).filter(User.email == register.email))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    hashed_pw = hash_password(register.password)
+    hashed_pw = await run_in_threadpool(hash_password, register.password)
 
     new_user = User(email=register.email, password=hashed_pw, full_name=register.full_name)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     access_token = create_access_token(data={"sub": str(new_user.id)})
     return {
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from starlette.responses import RedirectResponse
-from app.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from authlib.integrations.starlette_client import OAuth
-from app.dependencies import get_db
+from app.dependencies import get_async_db
 from app.models.models import User
 from app.auth.utils import create_access_token
 from dotenv import load_dotenv
@@ -34,7 +35,7 @@ async def login(request: Request):
     return await oauth.google.authorize_redirect(request, redirect_uri)
 
 @router.get("/callback")
-async def auth_callback(request: Request, db: SessionLocal = Depends(get_db)):
+async def auth_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     token = await oauth.google.authorize_access_token(request)
     user_info = token.get("userinfo")
 
@@ -44,13 +45,13 @@ async def auth_callback(request: Request, db: SessionLocal = Depends(get_db)):
     email = user_info["email"]
     name = user_info.get("name", "")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
 
     if not user:
         user = User(email=email, full_name=name, password="-")
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     access_token = create_access_token(data={"sub": str(user.id)})
     
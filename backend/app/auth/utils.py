@@ -3,8 +3,9 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.dependencies import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies import get_async_db
 from app.models.models import User
 import os
 from dotenv import load_dotenv
@@ -43,7 +44,7 @@ def decode_access_token(token: str):
             detail="Could not validate token"
         )
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
     token = None
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
@@ -69,7 +70,7 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
             detail="Invalid authentication credentials",
         )
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = (await db.execute(select(User).filter(User.id == int(user_id)))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+
+parser = argparse.ArgumentParser(description="Test de încărcare pentru API (rulează împotriva unui server pornit cu uvicorn)")
+parser.add_argument("--url", default="http://localhost:8000")
+parser.add_argument("--concurrency", default="1,8,32,128", help="niveluri de clienți simultani, separate prin virgulă")
+parser.add_argument("--duration", type=float, default=10.0, help="secunde pe nivel")
+parser.add_argument("--label", default="async", help="eticheta rulării, ex. sync / async")
+parser.add_argument("--baseline", default=None, help="eticheta unei rulări anterioare cu care se compară")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "load_test_results.jsonl"))
+
+YEAR_RANGE = (2000, 2022)
+
+def request_mix(rnd: random.Random, brands: list) -> str:
+    """A random listing-page style request; varying filters keep most requests out of the response cache."""
+    year_min = rnd.randint(*YEAR_RANGE)
+    max_price = rnd.randrange(5000, 80000, 500)
+    choice = rnd.random()
+    if choice < 0.5:
+        sort_by = rnd.choice(["price", "year", "mileage", "created_at"])
+        return f"/cars?year_min={year_min}&max_price={max_price}&sort_by={sort_by}&limit=20"
+    if choice < 0.7:
+        return f"/cars/count?year_min={year_min}&max_price={max_price}"
+    if choice < 0.85 and brands:
+        return f"/cars?brand={rnd.choice(brands)}&year_min={year_min}&limit=20"
+    if brands:
+        return f"/analytics/available-models/{rnd.choice(brands)}"
+    return "/analytics/available-brands"
+
+async def client_loop(client: httpx.AsyncClient, rnd: random.Random, brands: list, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        path = request_mix(rnd, brands)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def run_level(url: str, concurrency: int, duration: float, brands: list, seed: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], []
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            client_loop(client, random.Random(seed * 1000 + i), brands, deadline, latencies, errors)
+            for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 1) if latencies else None
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else None,
+        "errors": len(errors),
+    }
+
+def load_baseline(path: str, label: str):
+    if not label or not os.path.exists(path):
+        return None
+    baseline = None
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                run = json.loads(line)
+                if run.get("label") == label:
+                    baseline = run
+    return baseline
+
+def print_report(run: dict, baseline: dict = None):
+    before = {level["concurrency"]: level for level in (baseline or {}).get("levels", [])}
+    print("=" * 78)
+    print(f"LOAD TEST {run['url']} - {run['label']}, {run['duration']:.0f}s pe nivel")
+    print("=" * 78)
+    header = f"{'clienți':>8}{'cereri':>9}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'erori':>8}"
+    if baseline:
+        header += f"{'vs ' + baseline['label']:>16}"
+    print(header)
+    for level in run["levels"]:
+        line = (f"{level['concurrency']:>8}{level['requests']:>9}{level['requests_per_second']:>10.1f}"
+                f"{level['p50_ms']:>9}{level['p95_ms']:>9}{level['p99_ms']:>9}{level['errors']:>8}")
+        previous = before.get(level["concurrency"])
+        if previous and previous["requests_per_second"]:
+            line += f"{level['requests_per_second'] / previous['requests_per_second']:>15.2f}x"
+        print(line)
+    print("=" * 78)
+
+async def main():
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0) as client:
+        brands = (await client.get("/analytics/available-brands")).json()
+
+    results = []
+    for concurrency in levels:
+        print(f"{concurrency} clienți simultani...")
+        results.append(await run_level(args.url, concurrency, args.duration, brands, args.seed))
+
+    run = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "url": args.url,
+        "label": args.label,
+        "duration": args.duration,
+        "levels": results,
+    }
+    print_report(run, load_baseline(args.output, args.baseline))
+
+    with open(args.output, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Rezultate salvate în {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
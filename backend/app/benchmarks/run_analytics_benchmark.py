@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module; peak memory then comes from psutil, if installed.
+    resource = None
+
+# DATABASE_URL must be set before app.database builds the engine.
+parser = argparse.ArgumentParser(description="Benchmark analytics pe date sintetice")
+parser.add_argument("--size", default="10k", help="10k, 100k, 1m sau un număr de rânduri")
+parser.add_argument("--database-url", default=None, help="implicit un fișier SQLite lângă script")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--keep-data", action="store_true", help="refolosește anunțurile existente (rezultatele nu mai sunt comparabile între rulări)")
+parser.add_argument("--workers", type=int, default=1)
+parser.add_argument("--incremental", action="store_true")
+parser.add_argument("--skip-generations", action="store_true")
+parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "benchmark_results.jsonl"))
+
+SEED_CHUNK_ROWS = 5000
+
+def default_database_url(size: str) -> str:
+    return "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), f"benchmark_{size.lower()}.db")
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self.engine = engine
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self)
+
+def peak_rss_mb():
+    """Peak resident memory in MB, or None when it cannot be measured here."""
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return max(own, children) / scale
+    try:
+        import psutil
+    except ImportError:
+        return None
+    # Windows reports the peak working set of this process only, not of the worker processes.
+    memory = psutil.Process().memory_info()
+    return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+
+def seed_database(engine, size: int, seed: int, keep_data: bool) -> float:
+    from sqlalchemy import func, insert, select
+    from app.database import Base
+    from app.models.models import CarListing, User
+    from app.benchmarks.synthetic_listings import generate_car_listings
+
+    # The passes rewrite the rows they read, so every run starts from a fresh copy.
+    if not keep_data:
+        Base.metadata.create_all(engine)
+        with engine.connect() as conn:
+            if conn.execute(select(func.count(User.id))).scalar():
+                raise SystemExit("Baza de date conține utilizatori; benchmark-ul rulează doar pe o bază de test.")
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(CarListing.id))).scalar()
+    if existing:
+        print(f"Se refolosesc {existing:,} anunțuri existente.")
+        return 0.0
+
+    started = time.perf_counter()
+    chunk = []
+    with engine.begin() as conn:
+        for row in generate_car_listings(size, seed=seed):
+            chunk.append(row)
+            if len(chunk) >= SEED_CHUNK_ROWS:
+                conn.execute(insert(CarListing), chunk)
+                chunk = []
+        if chunk:
+            conn.execute(insert(CarListing), chunk)
+    seconds = time.perf_counter() - started
+    print(f"Generat {size:,} anunțuri sintetice în {seconds:.1f}s")
+    return seconds
+
+def timed_pass(engine, label: str, rows: int, run):
+    started = time.perf_counter()
+    with QueryCounter(engine) as counter:
+        result = run()
+    seconds = time.perf_counter() - started
+    peak_rss = peak_rss_mb()
+    return {
+        "label": label,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "queries": counter.count,
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }, result
+
+def load_previous_run(path: str, database: str, rows: int):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            run = json.loads(line)
+            if run.get("database") == database and run.get("rows") == rows and not run.get("keep_data"):
+                previous = run
+    return previous
+
+def print_report(run: dict, previous: dict = None):
+    previous_passes = {p["label"]: p for p in (previous or {}).get("passes", [])}
+
+    print("=" * 78)
+    print(f"BENCHMARK {run['database']} - {run['rows']:,} anunțuri, {run['workers']} worker(i)")
+    print("=" * 78)
+    if run["workers"] > 1:
+        print("Query-urile din procesele worker nu sunt numărate.")
+    print(f"{'Pass':<26}{'sec':>9}{'rows/s':>12}{'queries':>10}{'RSS MB':>9}{'vs prev':>12}")
+    for p in run["passes"]:
+        change = ""
+        before = previous_passes.get(p["label"])
+        if before and before["seconds"]:
+            change = f"{(p['seconds'] / before['seconds'] - 1) * 100:+.1f}%"
+        rate = f"{p['rows_per_second']:,.0f}" if p["rows_per_second"] else "-"
+        rss = f"{p['peak_rss_mb']:.1f}" if p["peak_rss_mb"] is not None else "n/a"
+        print(f"{p['label']:<26}{p['seconds']:>9.2f}{rate:>12}{p['queries']:>10,}{rss:>9}{change:>12}")
+
+    if run.get("deal_rating_phases"):
+        print("-" * 78)
+        for name, seconds in run["deal_rating_phases"].items():
+            print(f"  {name:<24}{seconds:>9.2f}")
+    print("=" * 78)
+
+def main():
+    args = parser.parse_args()
+
+    from app.benchmarks.synthetic_listings import parse_size
+    size = parse_size(args.size)
+    database_url = args.database_url or default_database_url(args.size)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("DB_PROFILE", "batch")
+
+    from sqlalchemy import func
+    from app.database import SessionLocal, engine
+    from app.models.models import CarListing
+    from app.analytics.update_deal_ratings import update_deal_ratings
+    from app.analytics.fill_missing_generations import assign_missing_generations
+
+    seed_seconds = seed_database(engine, size, args.seed, args.keep_data)
+
+    db = SessionLocal()
+    try:
+        rows = db.query(func.count(CarListing.id)).scalar()
+    finally:
+        db.close()
+
+    passes = []
+    deal_pass, stats = timed_pass(
+        engine, "update_deal_ratings", rows,
+        lambda: update_deal_ratings(incremental=args.incremental, workers=args.workers, checkpoint=False)
+    )
+    passes.append(deal_pass)
+
+    if not args.skip_generations:
+        generation_pass, _ = timed_pass(engine, "fill_missing_generations", rows, assign_missing_generations)
+        passes.append(generation_pass)
+
+    phases = {
+        key[:-len("_seconds")]: round(value, 3)
+        for key, value in stats.items()
+        if key.endswith("_seconds") and key != "elapsed_seconds"
+    }
+
+    run = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "database": engine.dialect.name,
+        "rows": rows,
+        "workers": args.workers,
+        "incremental": args.incremental,
+        "keep_data": args.keep_data,
+        "seed_seconds": round(seed_seconds, 3),
+        "passes": passes,
+        "deal_rating_phases": phases,
+    }
+
+    previous = None if args.keep_data else load_previous_run(args.output, run["database"], rows)
+    print_report(run, previous)
+
+    with open(args.output, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Rezultate salvate în {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import statistics
+import time
+
+# DATABASE_URL must be set before app.database builds the engine.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+parser = argparse.ArgumentParser(description="Microbenchmark: serializarea unei pagini /cars")
+parser.add_argument("--rows", type=int, default=100, help="anunțuri pe pagină")
+parser.add_argument("--repeat", type=int, default=500, help="de câte ori se serializează pagina")
+parser.add_argument("--seed", type=int, default=42)
+
+def load_page(rows: int, seed: int) -> list:
+    """One page of CARD_COLUMNS rows, read from an in-memory SQLite seeded with synthetic listings."""
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    from app.models.models import CarListing
+    from app.crud.car_listing_crud import CARD_COLUMNS
+    from app.benchmarks.synthetic_listings import generate_car_listings
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(CarListing), list(generate_car_listings(rows, seed=seed)))
+    with Session(engine) as db:
+        return db.query(*CARD_COLUMNS).order_by(CarListing.id).limit(rows).all()
+
+def pydantic_page(listings: list) -> bytes:
+    """The previous path: a validated CarListingCard per row, then response_model validation, jsonable_encoder and json."""
+    from typing import Any, Dict
+    from pydantic import TypeAdapter
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.crud.car_listing_crud import first_image
+    from app.schemas.car_listing_schema import CarListingCard
+
+    items = []
+    for row in listings:
+        values = dict(row._mapping)
+        images = values.pop("images")
+        items.append(CarListingCard(**values, image=first_image(images), is_favorite=False))
+    payload = {"items": items, "total": len(items), "total_exact": True, "next_cursor": None}
+    validated = TypeAdapter(Dict[str, Any]).validate_python(payload)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def fast_page(listings: list) -> bytes:
+    from app.crud.car_listing_crud import to_car_card
+    from app.responses import FastJSONResponse
+
+    items = [to_car_card(row) for row in listings]
+    payload = {"items": items, "total": len(items), "total_exact": True, "next_cursor": None}
+    return FastJSONResponse(payload).body
+
+def time_per_page(serialize, listings: list, repeat: int) -> list:
+    serialize(listings)  # warm-up: imports and pydantic schema build
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serialize(listings)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def main():
+    args = parser.parse_args()
+    listings = load_page(args.rows, args.seed)
+
+    before, after = pydantic_page(listings), fast_page(listings)
+    if json.loads(before) != json.loads(after):
+        raise SystemExit("Cele două căi produc JSON diferit!")
+
+    print("=" * 62)
+    print(f"Serializare pagină /cars: {len(listings)} anunțuri, {args.repeat} repetări")
+    print("=" * 62)
+    print(f"{'Cale':<28}{'median ms':>11}{'p95 ms':>10}{'KB':>8}")
+    medians = {}
+    for label, serialize, body in [("pydantic + json", pydantic_page, before), ("dict rows + orjson", fast_page, after)]:
+        samples = sorted(time_per_page(serialize, listings, args.repeat))
+        medians[label] = statistics.median(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{label:<28}{medians[label]:>11.3f}{p95:>10.3f}{len(body) / 1024:>8.1f}")
+    print("-" * 62)
+    print(f"Accelerare: {medians['pydantic + json'] / medians['dict rows + orjson']:.1f}x")
+    print("=" * 62)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+import json
+import random
+from app.constants.mappings import (
+    COLOR_MAPPING,
+    DRIVE_TYPE_MAPPING,
+    EMISSION_STANDARD_MAPPING,
+    FUEL_TYPE_MAPPING,
+    TRANSMISSION_MAPPING,
+)
+
+# Brands and models are not part of constants/mappings.py; these follow the
+# names the spiders store, with generation spans and a rough new-car price.
+BRAND_MODELS = {
+    "Volkswagen": {"Golf": [("Golf VI", 2008, 2012), ("Golf VII", 2012, 2019), ("Golf VIII", 2019, 2025)], "Passat": [("B7", 2010, 2014), ("B8", 2014, 2025)], "Tiguan": [("I", 2007, 2016), ("II", 2016, 2025)], "T-Roc": [("I", 2017, 2025)]},
+    "BMW": {"Seria 3": [("E90", 2005, 2012), ("F30", 2012, 2019), ("G20", 2019, 2025)], "Seria 5": [("F10", 2010, 2017), ("G30", 2017, 2025)], "X5": [("F15", 2013, 2018), ("G05", 2018, 2025)]},
+    "Audi": {"A4": [("B8", 2007, 2015), ("B9", 2015, 2025)], "A6": [("C7", 2011, 2018), ("C8", 2018, 2025)], "Q5": [("FY", 2016, 2025)]},
+    "Mercedes-Benz": {"C": [("W204", 2007, 2014), ("W205", 2014, 2021), ("W206", 2021, 2025)], "E": [("W212", 2009, 2016), ("W213", 2016, 2025)], "GLC": [("X253", 2015, 2022)]},
+    "Dacia": {"Logan": [("II", 2012, 2020), ("III", 2020, 2025)], "Duster": [("I", 2010, 2017), ("II", 2017, 2025)], "Sandero": [("II", 2012, 2020), ("III", 2020, 2025)]},
+    "Skoda": {"Octavia": [("III", 2013, 2020), ("IV", 2020, 2025)], "Superb": [("III", 2015, 2025)], "Fabia": [("III", 2014, 2021)]},
+    "Ford": {"Focus": [("Mk3", 2011, 2018), ("Mk4", 2018, 2025)], "Kuga": [("II", 2012, 2019), ("III", 2019, 2025)], "C-MAX": [("II", 2010, 2019)]},
+    "Renault": {"Megane": [("III", 2008, 2016), ("IV", 2016, 2025)], "Clio": [("IV", 2012, 2019), ("V", 2019, 2025)], "ZOE": [("I", 2012, 2025)]},
+    "Toyota": {"Corolla": [("E210", 2018, 2025)], "RAV-4": [("IV", 2012, 2018), ("V", 2018, 2025)], "Yaris": [("III", 2011, 2020)]},
+    "Opel": {"Astra": [("J", 2009, 2015), ("K", 2015, 2021)], "Insignia": [("A", 2008, 2017), ("B", 2017, 2025)]},
+    "Porsche": {"Cayenne": [("958", 2010, 2017), ("9Y0", 2017, 2025)]},
+}
+
+BASE_PRICES = {
+    "Volkswagen": 28000, "BMW": 45000, "Audi": 42000, "Mercedes-Benz": 47000, "Dacia": 15000,
+    "Skoda": 24000, "Ford": 24000, "Renault": 20000, "Toyota": 27000, "Opel": 22000, "Porsche": 95000,
+}
+
+# Typical engine capacity (cm3) -> power (CP) pairs; each model uses a few of them.
+ENGINE_VARIANTS = {999: 95, 1198: 110, 1395: 125, 1498: 150, 1598: 115, 1968: 150, 1995: 190, 2993: 286}
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+def parse_size(size: str) -> int:
+    return SIZES.get(size.lower()) or int(size)
+
+def _generation_for(spans, year):
+    for name, start, end in spans:
+        if start <= year <= end:
+            return name
+    return None
+
+def generate_car_listings(count: int, seed: int = 42, now: datetime = None):
+    """Yield ``count`` CarListing column dicts with realistic correlations between age, mileage and price."""
+    rnd = random.Random(seed)
+    now = now or datetime(2025, 6, 1)
+
+    fuel_types = sorted(set(FUEL_TYPE_MAPPING.values()))
+    transmissions = sorted(set(TRANSMISSION_MAPPING.values()))
+    drive_types = sorted(set(DRIVE_TYPE_MAPPING.values()))
+    colors = sorted(set(COLOR_MAPPING.values()))
+    emission_standards = sorted(set(EMISSION_STANDARD_MAPPING.values()))
+    brands = list(BRAND_MODELS)
+    brand_weights = [BASE_PRICES[brand] ** -0.5 for brand in brands]
+    model_engines = {
+        (brand, model): random.Random(f"{brand} {model}").sample(sorted(ENGINE_VARIANTS), 3)
+        for brand, models in BRAND_MODELS.items()
+        for model in models
+    }
+
+    for i in range(count):
+        brand = rnd.choices(brands, weights=brand_weights)[0]
+        model = rnd.choice(list(BRAND_MODELS[brand]))
+        spans = BRAND_MODELS[brand][model]
+        year = rnd.randint(spans[0][1], min(spans[-1][2], now.year))
+        age = max(0, now.year - year)
+
+        fuel_type = rnd.choices(fuel_types, weights=[5 if f in ("Diesel", "Petrol") else 0.2 for f in fuel_types])[0]
+        is_electric = fuel_type == "Electric"
+        transmission = "Automatic" if is_electric else rnd.choices(transmissions, weights=[1.4 if t == "Manual" else 1 for t in transmissions])[0]
+        if is_electric:
+            engine_capacity, engine_power = 0, rnd.choice([136, 204, 286])
+        else:
+            engine_capacity = rnd.choice(model_engines[(brand, model)])
+            engine_power = ENGINE_VARIANTS[engine_capacity] + rnd.randint(-5, 5)
+        mileage = int(age * 14000 * rnd.uniform(0.7, 1.3) + rnd.randint(0, 5000)) // 100 * 100
+
+        price = BASE_PRICES[brand] * (0.86 ** age) * (1 - min(mileage, 400000) / 1_000_000)
+        price = round(max(500, price * rnd.uniform(0.8, 1.2)), -1)
+        roll = rnd.random()
+        if roll < 0.01:
+            price = rnd.choice([1, 123, 1111, 1234])
+        elif roll < 0.02:
+            price = price * rnd.choice([0.05, 8])
+
+        created_at = now - timedelta(days=rnd.randint(0, 365), minutes=rnd.randint(0, 1440))
+        sold = rnd.random() < 0.3
+
+        yield {
+            "title": f"{brand} {model} {engine_capacity / 1000:.1f}",
+            "brand": brand,
+            "model": model,
+            "price": float(price),
+            "year": year,
+            "mileage": mileage or None,
+            "fuel_type": fuel_type,
+            "transmission": transmission,
+            "engine_power": engine_power,
+            "emission_standard": rnd.choice(emission_standards),
+            "doors": rnd.choice([3, 5, 5, 5]),
+            "color": rnd.choice(colors),
+            "drive_type": rnd.choice(drive_types),
+            "vehicle_condition": "Used" if age else "New",
+            "vin": f"BENCH{seed:04d}{i:012d}",
+            "location": rnd.choice(["Bucuresti", "Cluj-Napoca", "Iasi", "Timisoara", "Brasov", "Constanta"]),
+            "description": "Masina intretinuta, revizii la zi. " * rnd.randint(5, 40),
+            "seller_type": rnd.choice(["Private", "Dealer"]),
+            "engine_capacity": engine_capacity,
+            "is_new": False,
+            "images": json.dumps([f"https://example.invalid/{i}/{n}.jpg" for n in range(rnd.randint(3, 15))]),
+            "source_url": f"https://www.olx.ro/d/oferta/bench-{seed}-{i}.html",
+            "generation": _generation_for(spans, year) if rnd.random() < 0.7 else None,
+            "first_owner": rnd.choice([True, False, None]),
+            "no_accident": rnd.choice([True, False, None]),
+            "service_book": rnd.choice([True, False, None]),
+            "registered": rnd.choice([True, False, None]),
+            "features": json.dumps({"Confort": ["Climatronic", "Scaune incalzite"]}),
+            "ad_created_at": created_at,
+            "price_history": None,
+            "sold": sold,
+            "sold_detected_at": created_at + timedelta(days=rnd.randint(1, 90)) if sold else None,
+            "damaged": rnd.random() < 0.03,
+            "right_hand_drive": rnd.random() < 0.01,
+            "suspicious_price": False,
+            "created_at": created_at,
+        }
@@ -1,12 +1,126 @@
+from sqlalchemy import and_, func, literal, tuple_
 from sqlalchemy.orm import Session
 from app.models.models import CarListing
 from app.schemas.car_listing_schema import CarListingOut
 from datetime import datetime
 from typing import List, Optional
-from app.models.models import Favorite
+from app.models.models import Favorite, SimilarListings
+from app.crud.car_search_crud import search_criteria, search_ranking
+from app.crud.query_cache import TTLCache, filter_signature
+from app.crud.listing_snapshot import snapshot_search
+from app.crud.similarity_index import FEATURE_COLUMNS, PRECOMPUTED_SIMILAR, similar_candidates
+import base64
+import json
+import orjson
 
-def get_all_car_listings(
-    db: Session,
+SORT_COLUMNS = ["price", "year", "mileage", "created_at", "engine_power"]
+
+# Columns a result card renders; the long text columns stay on /cars/{car_id}.
+CARD_COLUMNS = [
+    CarListing.id, CarListing.title, CarListing.brand, CarListing.model, CarListing.price,
+    CarListing.year, CarListing.mileage, CarListing.fuel_type, CarListing.transmission,
+    CarListing.engine_capacity, CarListing.engine_power, CarListing.drive_type, CarListing.generation,
+    CarListing.location, CarListing.images, CarListing.deal_rating, CarListing.estimated_price,
+    CarListing.quality_score, CarListing.suspicious_price, CarListing.right_hand_drive,
+    CarListing.sold, CarListing.created_at
+]
+
+# Ranked search results have no seekable key; their cursors carry the next offset.
+RELEVANCE_SORT = "relevance"
+
+COUNT_EXACT_THRESHOLD = 10000
+COUNT_CACHE_TTL_SECONDS = 60
+FACET_CACHE_TTL_SECONDS = 60
+
+# Facet columns; each facet is counted without its own filter.
+FACET_COLUMNS = ["brand", "fuel_type", "transmission", "drive_type", "color", "seller_type", "deal_rating"]
+
+_count_cache = TTLCache(COUNT_CACHE_TTL_SECONDS, clear_on_data_change=True)
+_facet_cache = TTLCache(FACET_CACHE_TTL_SECONDS, clear_on_data_change=True)
+
+class InvalidCursor(ValueError):
+    pass
+
+CARD_FIELDS = [column.key for column in CARD_COLUMNS]
+
+def first_image(images: Optional[str]) -> Optional[str]:
+    try:
+        parsed = orjson.loads(images) if images else []
+    except ValueError:
+        return None
+    return parsed[0] if isinstance(parsed, list) and parsed else None
+
+def to_car_card(row, is_favorite: bool = False) -> dict:
+    """CarListingCard fields as a plain dict, built straight from a CARD_COLUMNS row.
+
+    The columns already have the schema's types, so the rows are not
+    validated again; FastJSONResponse encodes the dicts as they are.
+    """
+    card = dict(zip(CARD_FIELDS, row))
+    card["image"] = first_image(card.pop("images"))
+    card["is_favorite"] = is_favorite
+    return card
+
+def encode_cursor(sort_by: Optional[str], order: str, value, car_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"sort_by": sort_by, "order": order, "value": value, "id": car_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: Optional[str], order: str):
+    """Return the (sort value, id) the cursor points after; InvalidCursor if it is malformed or from another sort."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, car_id = payload["value"], int(payload["id"])
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+    if payload.get("sort_by") != sort_by or payload.get("order") != order:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    try:
+        if sort_by == "created_at" and value is not None:
+            value = datetime.fromisoformat(value)
+        elif sort_by == RELEVANCE_SORT:
+            value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    return value, car_id
+
+def seek_car_listings(query, sort_by: Optional[str], descending: bool, after_value, after_id: int, limit: int):
+    """The page following (after_value, after_id) in (sort column NULLS LAST, id) order.
+
+    Non-null values are fetched with a row-value comparison that walks the
+    (column, id) index; NULLs, which sort last, are appended from a second
+    range on id once the non-null rows run out.
+    """
+    id_column = CarListing.id
+    if not sort_by:
+        return query.filter(id_column > after_id).order_by(id_column.asc()).limit(limit).all()
+
+    sort_column = getattr(CarListing, sort_by)
+    listings = []
+
+    if after_value is not None:
+        if descending:
+            seek = tuple_(sort_column, id_column) < tuple_(after_value, after_id)
+            ordering = (sort_column.desc(), id_column.desc())
+        else:
+            seek = tuple_(sort_column, id_column) > tuple_(after_value, after_id)
+            ordering = (sort_column.asc(), id_column.asc())
+        listings = query.filter(seek).order_by(*ordering).limit(limit).all()
+        null_seek = sort_column == None
+    else:
+        null_seek = and_(sort_column == None, id_column < after_id if descending else id_column > after_id)
+
+    if len(listings) < limit:
+        listings += query.filter(null_seek).order_by(
+            id_column.desc() if descending else id_column.asc()
+        ).limit(limit - len(listings)).all()
+
+    return listings
+
+def apply_car_filters(
+    query,
     brand: Optional[List[str]] = None,
     model: Optional[List[str]] = None,
     min_price: float = None,
@@ -45,23 +159,10 @@ def get_all_car_listings(
     quality_score_max: Optional[int] = None,
     suspicious_price: Optional[bool] = None,
     is_new: Optional[bool] = None,
-    sort_by: str = None,
-    order: str = "asc",
-    page: int = 1,
-    limit: int = 20,
-    search: str = None,
-    user_id: Optional[int] = None
+    search: str = None
 ):
-    query = db.query(CarListing)
-
     if search:
-        search_lower = f"%{search.lower()}%"
-        query = query.filter(
-            CarListing.title.ilike(search_lower) |
-            CarListing.model.ilike(search_lower) |
-            CarListing.brand.ilike(search_lower) |
-            CarListing.description.ilike(search_lower)
-        )
+        query = query.filter(search_criteria(query.session, search))
 
     if brand:
         query = query.filter(CarListing.brand.in_(brand))
@@ -140,36 +241,199 @@ def get_all_car_listings(
     if is_new is not None:
         query = query.filter(CarListing.is_new == is_new)
 
-    if sort_by in ["price", "year", "mileage", "created_at", "engine_power"]:
-        sort_column = getattr(CarListing, sort_by)
-        if order == "desc":
-            query = query.order_by(sort_column.desc().nulls_last())
+    return query
+
+def estimate_row_count(db: Session, query) -> Optional[int]:
+    """The planner's row estimate for ``query`` (Postgres only, None elsewhere)."""
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return None
+    compiled = query.statement.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        # asyncpg takes $1-style positional parameters
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def count_car_listings(db: Session, **filters) -> dict:
+    """Number of listings matching ``filters`` and whether it is exact.
+
+    Counts the planner estimates above COUNT_EXACT_THRESHOLD are returned as
+    estimates; smaller ones are counted. Results are cached per filter
+    signature for COUNT_CACHE_TTL_SECONDS.
+    """
+    signature = filter_signature(filters)
+    cached = _count_cache.get(signature)
+    if cached is not None:
+        return cached
+
+    query = apply_car_filters(db.query(CarListing.id), **filters)
+    estimate = estimate_row_count(db, query)
+    if estimate is not None and estimate >= COUNT_EXACT_THRESHOLD:
+        result = {"total": estimate, "exact": False}
+    else:
+        total = query.with_entities(func.count(CarListing.id)).scalar()
+        result = {"total": total, "exact": True}
+
+    _count_cache.set(signature, result)
+    return result
+
+def clear_count_cache():
+    _count_cache.clear()
+
+def facet_condition(column: str, value):
+    if column == "deal_rating":
+        return CarListing.deal_rating == value
+    return getattr(CarListing, column).in_(value)
+
+def get_car_facets(db: Session, **filters) -> dict:
+    """Per-value listing counts for every FACET_COLUMNS entry under ``filters``.
+
+    Each facet ignores its own filter, so the sidebar can still offer the
+    other values of a facet the user has already narrowed. On Postgres all
+    facets come from one scan: GROUPING SETS with a count per facet that
+    FILTERs on the other facets' conditions. Active-listing facets are
+    counted from the search snapshot's bitmap index when it is enabled.
+    """
+    signature = filter_signature(filters)
+    cached = _facet_cache.get(signature)
+    if cached is not None:
+        return cached
+
+    snapshot = snapshot_search.get(db, filters)
+    if snapshot is not None:
+        facets = snapshot.facets(filters, FACET_COLUMNS)
+        _facet_cache.set(signature, facets)
+        return facets
+
+    facet_values = {column: filters.pop(column, None) for column in FACET_COLUMNS}
+    conditions = {column: facet_condition(column, value) for column, value in facet_values.items() if value}
+
+    def others(column):
+        return [condition for name, condition in conditions.items() if name != column]
+
+    columns = [getattr(CarListing, column) for column in FACET_COLUMNS]
+    facets = {column: [] for column in FACET_COLUMNS}
+
+    if db.get_bind().dialect.name == "postgresql":
+        counts = [
+            func.count(CarListing.id).filter(and_(*others(column))) if others(column) else func.count(CarListing.id)
+            for column in FACET_COLUMNS
+        ]
+        groupings = [func.grouping(column) for column in columns]
+        query = apply_car_filters(db.query(*columns, *groupings, *counts), **filters).group_by(
+            func.grouping_sets(*[tuple_(column) for column in columns])
+        )
+        width = len(FACET_COLUMNS)
+        for row in query.all():
+            i = list(row[width:2 * width]).index(0)
+            if row[i] is not None and row[2 * width + i]:
+                facets[FACET_COLUMNS[i]].append({"value": row[i], "count": row[2 * width + i]})
+    else:
+        selects = []
+        for column_name, column in zip(FACET_COLUMNS, columns):
+            selects.append(
+                apply_car_filters(
+                    db.query(literal(column_name).label("facet"), column.label("value"), func.count(CarListing.id).label("count")),
+                    **filters
+                ).filter(*others(column_name), column != None).group_by(column)
+            )
+        for facet, value, count in selects[0].union_all(*selects[1:]).all():
+            facets[facet].append({"value": value, "count": count})
+
+    for values in facets.values():
+        values.sort(key=lambda item: (-item["count"], str(item["value"])))
+
+    _facet_cache.set(signature, facets)
+    return facets
+
+def hydrate_car_listings(db: Session, car_ids: List[int], *criteria) -> list:
+    """CARD_COLUMNS rows for ``car_ids``, in that order; ids no longer in the table or not matching ``criteria`` are skipped."""
+    if not car_ids:
+        return []
+    rows = {row.id: row for row in db.query(*CARD_COLUMNS).filter(CarListing.id.in_(car_ids), *criteria).all()}
+    return [rows[car_id] for car_id in car_ids if car_id in rows]
+
+def get_all_car_listings(
+    db: Session,
+    sort_by: str = None,
+    order: str = "asc",
+    page: int = 1,
+    limit: int = 20,
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    **filters
+):
+    query = apply_car_filters(db.query(*CARD_COLUMNS), **filters)
+
+    if sort_by not in SORT_COLUMNS:
+        sort_by = None
+    descending = sort_by is not None and order == "desc"
+
+    ranking = None
+    if sort_by is None and filters.get("search"):
+        ranking = search_ranking(db, filters["search"])
+
+    snapshot = snapshot_search.get(db, filters)
+    if snapshot is None:
+        counted = count_car_listings(db, **filters)
+
+    if snapshot is not None:
+        # The snapshot picks the page and counts exactly; the database only loads those rows.
+        after = decode_cursor(cursor, sort_by, order) if cursor else None
+        page_ids, total = snapshot.search(filters, sort_by, descending, (page - 1) * limit, limit, after)
+        listings = hydrate_car_listings(db, page_ids)
+        counted = {"total": total, "exact": True}
+    elif ranking is not None:
+        offset = (page - 1) * limit
+        if cursor:
+            offset, _ = decode_cursor(cursor, RELEVANCE_SORT, order)
+        listings = query.order_by(*ranking).offset(offset).limit(limit).all()
+        sort_by = RELEVANCE_SORT
+    elif cursor:
+        after_value, after_id = decode_cursor(cursor, sort_by, order)
+        listings = seek_car_listings(query, sort_by, descending, after_value, after_id, limit)
+    else:
+        # Same (column NULLS LAST, id) order the cursor seeks through.
+        if sort_by is None:
+            query = query.order_by(CarListing.id.asc())
+        elif descending:
+            query = query.order_by(getattr(CarListing, sort_by).desc().nulls_last(), CarListing.id.desc())
         else:
-            query = query.order_by(sort_column.asc().nulls_last())
+            query = query.order_by(getattr(CarListing, sort_by).asc().nulls_last(), CarListing.id.asc())
+        listings = query.offset((page - 1) * limit).limit(limit).all()
 
-    total_count = query.count()
-    listings = query.offset((page - 1) * limit).limit(limit).all()
+    next_cursor = None
+    if listings and len(listings) == limit:
+        last = listings[-1]
+        if sort_by == RELEVANCE_SORT:
+            next_cursor = encode_cursor(sort_by, order, offset + limit, last.id)
+        else:
+            next_cursor = encode_cursor(sort_by, order, getattr(last, sort_by) if sort_by else None, last.id)
 
     if not user_id:
-        results = [CarListingOut.model_validate(car) for car in listings]
+        results = [to_car_card(car) for car in listings]
         return {
             "items": results,
-            "total": total_count
+            "total": counted["total"],
+            "total_exact": counted["exact"],
+            "next_cursor": next_cursor
         }
 
     favorite_ids = {
-        fav.car_id for fav in db.query(Favorite).filter(Favorite.user_id == user_id).all()
+        car_id for car_id, in db.query(Favorite.car_id).filter(Favorite.user_id == user_id).all()
     }
 
-    results = []
-    for car in listings:
-        car_out = CarListingOut.model_validate(car)
-        car_out.is_favorite = car.id in favorite_ids
-        results.append(car_out)
+    results = [to_car_card(car, car.id in favorite_ids) for car in listings]
 
     return {
         "items": results,
-        "total": total_count
+        "total": counted["total"],
+        "total_exact": counted["exact"],
+        "next_cursor": next_cursor
     }
 
 def get_car_by_id(db: Session, car_id: int, user_id: Optional[int] = None):
@@ -187,3 +451,26 @@ def get_car_by_id(db: Session, car_id: int, user_id: Optional[int] = None):
 
     return car_out
 
+def get_similarity_features(db: Session, car_id: int):
+    """Brand, model and FEATURE_COLUMNS of ``car_id``, or None if it does not exist."""
+    features = [getattr(CarListing, name) for name in FEATURE_COLUMNS]
+    return db.query(CarListing.brand, CarListing.model, *features).filter(CarListing.id == car_id).first()
+
+def get_stored_similar_car_cards(db: Session, car_id: int, limit: int) -> Optional[list]:
+    """Cards from the list stored by app.analytics.precompute_similar, or None if there is no
+    usable one: too short for ``limit`` or with a listing that is no longer a candidate."""
+    if limit > PRECOMPUTED_SIMILAR:
+        return None
+    stored = db.get(SimilarListings, car_id)
+    if stored is None:
+        return None
+    stored_ids = json.loads(stored.similar_ids)[:limit]
+    listings = hydrate_car_listings(db, stored_ids, *similar_candidates())
+    if len(listings) != len(stored_ids):
+        return None
+    return [to_car_card(row) for row in listings]
+
+def get_similar_car_cards(db: Session, similar_ids: list) -> list:
+    # The in-memory index can be a few minutes behind; listings sold
+    # meanwhile are dropped rather than suggested.
+    return [to_car_card(row) for row in hydrate_car_listings(db, similar_ids, *similar_candidates())]
@@ -0,0 +1,60 @@
+from sqlalchemy import func, inspect, literal, literal_column, or_
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+
+# Brand, model and title are names, so they are indexed without stemming;
+# descriptions are Romanian prose and get the Romanian stemmer.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}brand, '') || ' ' || coalesce({row}model, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}title, '')), 'B') ||
+    setweight(to_tsvector('romanian', coalesce({row}description, '')), 'D')
+"""
+
+# Queries must use the same expression as the ix_car_listings_brand_model_trgm index.
+BRAND_MODEL_TRGM_SQL = "lower(coalesce({row}brand, '') || ' ' || coalesce({row}model, ''))"
+
+search_vector = literal_column("car_listings.search_vector")
+brand_model_text = literal_column(BRAND_MODEL_TRGM_SQL.format(row="car_listings."))
+
+_fulltext_available = {}
+
+def fulltext_available(db: Session) -> bool:
+    """True on Postgres once migrate_search_index has added the search_vector column."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    if bind.url not in _fulltext_available:
+        columns = inspect(bind).get_columns("car_listings")
+        _fulltext_available[bind.url] = any(column["name"] == "search_vector" for column in columns)
+    return _fulltext_available[bind.url]
+
+def search_tsquery(search: str):
+    return func.websearch_to_tsquery(literal_column("'simple'::regconfig"), search).op("||")(
+        func.websearch_to_tsquery(literal_column("'romanian'::regconfig"), search)
+    )
+
+def search_criteria(db: Session, search: str):
+    if not fulltext_available(db):
+        search_lower = f"%{search.lower()}%"
+        return (
+            CarListing.title.ilike(search_lower) |
+            CarListing.model.ilike(search_lower) |
+            CarListing.brand.ilike(search_lower) |
+            CarListing.description.ilike(search_lower)
+        )
+
+    # Full-text match, or a trigram word match for misspelled brand/model names.
+    return or_(
+        search_vector.op("@@")(search_tsquery(search)),
+        literal(search.lower()).op("<%")(brand_model_text)
+    )
+
+def search_ranking(db: Session, search: str):
+    """ORDER BY terms putting the best matches first, or None when full-text search is unavailable."""
+    if not fulltext_available(db):
+        return None
+    return (
+        func.ts_rank_cd(search_vector, search_tsquery(search)).desc(),
+        func.word_similarity(search.lower(), brand_model_text).desc(),
+        CarListing.id.asc()
+    )
@@ -0,0 +1,74 @@
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.models import DataVersion
+from datetime import datetime
+import time
+import weakref
+
+LISTINGS_DATA = "car_listings"
+
+# Spiders write one listing at a time; bumping on every insert would keep the
+# API caches permanently cold during a crawl.
+SPIDER_BUMP_INTERVAL_SECONDS = 30
+
+def get_data_version(db: Session, name: str = LISTINGS_DATA) -> int:
+    version = db.query(DataVersion.version).filter(DataVersion.name == name).scalar()
+    return version or 0
+
+def bump_data_version(db: Session, name: str = LISTINGS_DATA):
+    """Increments the version in the caller's transaction; it becomes visible when the caller commits.
+
+    An upsert, so two writers creating the first row at once do not fail on the primary key.
+    """
+    now = datetime.utcnow()
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    statement = insert(DataVersion).values(name=name, version=1, updated_at=now)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[DataVersion.name],
+        set_={"version": DataVersion.version + 1, "updated_at": now}
+    ))
+
+class ThrottledVersionBump:
+    """Bumps the data version at most once per interval while a spider writes listings.
+
+    ``changed`` is called inside the transaction that writes a listing;
+    ``finish`` publishes whatever is still pending when the spider closes.
+    A bump only counts once its transaction commits: if it is rolled back,
+    the next ``changed`` bumps again.
+    """
+
+    def __init__(self, interval_seconds: float = SPIDER_BUMP_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.last_bump = time.monotonic()
+        self.changes = 0
+        # Session whose transaction holds a bump not yet committed.
+        self.pending = None
+        self.sessions = weakref.WeakSet()
+
+    def changed(self, db: Session):
+        self.changes += 1
+        if self.pending is None and time.monotonic() - self.last_bump >= self.interval_seconds:
+            if db not in self.sessions:
+                event.listen(db, "after_commit", self.committed)
+                event.listen(db, "after_rollback", self.rolled_back)
+                self.sessions.add(db)
+            bump_data_version(db)
+            self.pending = db
+
+    def committed(self, db: Session):
+        if self.pending is db:
+            self.pending = None
+            # The commit also published every change recorded before it.
+            self.changes = 0
+            self.last_bump = time.monotonic()
+
+    def rolled_back(self, db: Session):
+        if self.pending is db:
+            self.pending = None
+
+    def finish(self, db: Session):
+        if self.changes:
+            bump_data_version(db)
+            db.commit()
+            self.changes = 0
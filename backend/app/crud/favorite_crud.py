@@ -1,36 +1,41 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import Favorite
 from app.schemas.favorite_schema import FavoriteCreate
-from sqlalchemy.orm import joinedload
-
-def create_favorite(db: Session, favorite_data: FavoriteCreate):
-    existing = db.query(Favorite).filter(
-        Favorite.user_id == favorite_data.user_id,
-        Favorite.car_id == favorite_data.car_id
-    ).first()
+from sqlalchemy.orm import selectinload
+
+# FavoriteOut includes the car; async sessions cannot lazy-load it, so it is always loaded up front.
+async def get_favorite(db: AsyncSession, user_id: int, car_id: int):
+    result = await db.execute(
+        select(Favorite).options(selectinload(Favorite.car)).filter(
+            Favorite.user_id == user_id,
+            Favorite.car_id == car_id
+        )
+    )
+    return result.scalars().first()
+
+async def create_favorite(db: AsyncSession, favorite_data: FavoriteCreate):
+    existing = await get_favorite(db, favorite_data.user_id, favorite_data.car_id)
     if existing:
         return existing
 
     favorite = Favorite(**favorite_data.dict())
     db.add(favorite)
-    db.commit()
-    db.refresh(favorite)
-    return favorite
+    await db.commit()
+    return await get_favorite(db, favorite_data.user_id, favorite_data.car_id)
 
 
-def get_favorites_by_user(db: Session, user_id: int):
-    return db.query(Favorite).filter(Favorite.user_id == user_id).all()
+async def get_favorites_by_user(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(Favorite).options(selectinload(Favorite.car)).filter(Favorite.user_id == user_id)
+    )
+    return result.scalars().all()
 
-def delete_favorite_by_user_and_car(db: Session, user_id: int, car_id: int):
-    favorite = db.query(Favorite).options(joinedload(Favorite.car)).filter(
-        Favorite.user_id == user_id,
-        Favorite.car_id == car_id
-    ).first()
+async def delete_favorite_by_user_and_car(db: AsyncSession, user_id: int, car_id: int):
+    favorite = await get_favorite(db, user_id, car_id)
 
     if favorite:
-        db.delete(favorite)
-        db.commit()
+        await db.delete(favorite)
+        await db.commit()
         return favorite
     return None
-
-
@@ -0,0 +1,82 @@
+from pyroaring import BitMap, FrozenBitMap
+import numpy as np
+
+def to_bitmap(ids) -> FrozenBitMap:
+    return FrozenBitMap(np.asarray(ids, dtype=np.uint32).tolist())
+
+def bitmap_ids(bitmap) -> np.ndarray:
+    return np.frombuffer(bitmap.to_array(), dtype=np.uint32).astype(np.int64)
+
+class BitmapIndex:
+    """Roaring bitmap of listing ids per (column, value code) of the snapshot's categorical and flag columns.
+
+    Codes are the snapshot's dictionary codes (1 / 0 for flags); NULLs are not
+    indexed, so they never match a filter or a facet, as in SQL. An index is
+    never modified in place: ``updated`` applies removals and additions to
+    copies of the affected bitmaps and returns a new index.
+    """
+
+    def __init__(self, bitmaps: dict, all_ids: FrozenBitMap):
+        self.bitmaps = bitmaps
+        self.all_ids = all_ids
+
+    @classmethod
+    def build(cls, ids, columns: dict):
+        """Index ``ids`` (int64) by ``columns``, a dict of column name -> code array aligned with ids."""
+        return cls({name: {} for name in columns}, FrozenBitMap()).updated(np.empty(0, dtype=np.int64), ids, columns)
+
+    def updated(self, removed, ids, columns: dict):
+        """A new index without the ``removed`` ids and with ``ids`` added under their codes in ``columns``.
+
+        Changed listings are passed in both: removed under their old values,
+        added under the new ones.
+        """
+        removed = to_bitmap(removed)
+        bitmaps = {}
+        for name, codes in columns.items():
+            added = {}
+            if len(ids):
+                order = np.argsort(codes, kind="stable")
+                sorted_codes = codes[order]
+                starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+                for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+                    if sorted_codes[start] >= 0:
+                        added[int(sorted_codes[start])] = ids[order[start:end]]
+
+            column = {}
+            for code in self.bitmaps.get(name, {}).keys() | added.keys():
+                bitmap = self.bitmaps.get(name, {}).get(code, FrozenBitMap())
+                if removed:
+                    bitmap = bitmap - removed
+                if code in added:
+                    bitmap = bitmap | to_bitmap(added[code])
+                if bitmap:
+                    column[code] = FrozenBitMap(bitmap)
+            bitmaps[name] = column
+
+        all_ids = (self.all_ids - removed) | to_bitmap(ids)
+        return BitmapIndex(bitmaps, FrozenBitMap(all_ids))
+
+    def any_of(self, column: str, codes) -> BitMap:
+        """Ids having any of ``codes`` in ``column`` (an IN-list is the OR of its values' bitmaps)."""
+        bitmaps = [self.bitmaps[column][code] for code in codes if code in self.bitmaps[column]]
+        return BitMap.union(*bitmaps) if bitmaps else BitMap()
+
+    def all_of(self, conditions: dict):
+        """AND of ``any_of`` over ``conditions`` (column -> codes), or None when there are no conditions."""
+        selected = None
+        # Smallest first, so the intersections shrink as early as possible.
+        for bitmap in sorted((self.any_of(column, codes) for column, codes in conditions.items()), key=len):
+            selected = bitmap if selected is None else selected & bitmap
+            if not selected:
+                break
+        return selected
+
+    def counts(self, column: str, base) -> dict:
+        """Number of ``base`` ids per code of ``column``, without materializing the intersections."""
+        counts = {}
+        for code, bitmap in self.bitmaps[column].items():
+            count = base.intersection_cardinality(bitmap)
+            if count:
+                counts[code] = count
+        return counts
@@ -0,0 +1,416 @@
+from sqlalchemy import literal_column, select
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+from app.crud.data_version_crud import get_data_version
+from app.crud.query_cache import DATA_VERSION_CHECK_SECONDS
+from app.crud.listing_bitmap_index import BitmapIndex, bitmap_ids, to_bitmap
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import numpy as np
+import operator
+import os
+import threading
+import time
+
+load_dotenv()
+
+# "snapshot" answers active-listing searches from an in-memory columnar copy
+# of the listings; "sql" (the default) always queries the database.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "sql")
+
+# Ids per IN (...) when fetching changed rows during an incremental refresh.
+REFRESH_FETCH_BATCH = 5000
+
+# Dictionary-encoded columns: int32 codes into a per-column list of values, -1 for NULL.
+CATEGORICAL_COLUMNS = [
+    "brand", "model", "fuel_type", "transmission", "drive_type", "color", "vehicle_condition",
+    "seller_type", "deal_rating", "version", "generation", "emissions", "origin_country"
+]
+# float64 with NaN for NULL, so a NULL never satisfies a comparison, as in SQL.
+# created_at is stored as microseconds since the epoch.
+NUMERIC_COLUMNS = [
+    "price", "year", "mileage", "engine_power", "engine_capacity", "doors", "previous_owners",
+    "estimated_price", "quality_score", "created_at"
+]
+# int8: 1 / 0, -1 for NULL.
+FLAG_COLUMNS = [
+    "first_owner", "no_accident", "service_book", "registered", "damaged", "right_hand_drive",
+    "suspicious_price", "is_new"
+]
+SNAPSHOT_COLUMNS = CATEGORICAL_COLUMNS + NUMERIC_COLUMNS + FLAG_COLUMNS
+
+# The predicates of apply_car_filters, by filter name. Like there, these
+# filters only apply when their value is truthy.
+IN_FILTERS = ["brand", "model", "fuel_type", "transmission", "drive_type", "color", "vehicle_condition", "seller_type"]
+EQUALS_FILTERS = ["deal_rating", "version", "generation", "emissions", "origin_country"]
+RANGE_FILTERS = {
+    "min_price": ("price", operator.ge),
+    "max_price": ("price", operator.le),
+    "year_min": ("year", operator.ge),
+    "year_max": ("year", operator.le),
+    "mileage_min": ("mileage", operator.ge),
+    "mileage_max": ("mileage", operator.le),
+    "doors": ("doors", operator.eq),
+    "engine_power_min": ("engine_power", operator.ge),
+    "engine_power_max": ("engine_power", operator.le),
+    "previous_owners": ("previous_owners", operator.le),
+    "engine_capacity_min": ("engine_capacity", operator.ge),
+    "engine_capacity_max": ("engine_capacity", operator.le),
+    "estimated_price": ("estimated_price", operator.le),
+}
+# These apply whenever they are not None.
+NOT_NONE_RANGE_FILTERS = {
+    "quality_score_min": ("quality_score", operator.ge),
+    "quality_score_max": ("quality_score", operator.le),
+}
+
+# Columns with a roaring bitmap per value; their filters are answered with
+# bitmap AND/OR instead of a scan over the codes.
+INDEXED_COLUMNS = IN_FILTERS + ["deal_rating"] + FLAG_COLUMNS
+
+# Filters the snapshot cannot evaluate; requests using them go to the database.
+SQL_ONLY_FILTERS = ["search", "itp_valid_until_before"]
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_micros(value: datetime) -> float:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def row_version_column(db: Session):
+    """Postgres' xmin changes whenever a row is updated, which lets a refresh skip unchanged rows."""
+    if db.get_bind().dialect.name == "postgresql":
+        return literal_column("car_listings.xmin::text::bigint").label("row_version")
+    return None
+
+def active_listings_query(db: Session):
+    """The rows a ``sold=False`` search can return, matching apply_car_filters(sold=False)."""
+    columns = [CarListing.id]
+    row_version = row_version_column(db)
+    if row_version is not None:
+        columns.append(row_version)
+    return select(*columns).where(CarListing.sold == False).order_by(CarListing.id)
+
+class Dictionary:
+    """Value <-> code mapping of one categorical column; codes are only ever appended."""
+
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def copy(self):
+        return Dictionary(self.values)
+
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, values) -> list:
+        return [self.codes[value] for value in values if value in self.codes]
+
+def encode_rows(rows: list, dictionaries: dict):
+    """(ids, row_versions, columns) arrays for (id, row_version, *SNAPSHOT_COLUMNS) tuples, ordered by id.
+
+    Categorical values are encoded with ``dictionaries``, which gain any new values.
+    """
+    fields = list(zip(*rows)) if rows else [()] * (2 + len(SNAPSHOT_COLUMNS))
+    columns = {}
+    for name, values in zip(SNAPSHOT_COLUMNS, fields[2:]):
+        if name in dictionaries:
+            encode = dictionaries[name].encode
+            columns[name] = np.fromiter((encode(value) for value in values), dtype=np.int32, count=len(values))
+        elif name == "created_at":
+            columns[name] = np.array([np.nan if value is None else to_micros(value) for value in values], dtype=np.float64)
+        elif name in NUMERIC_COLUMNS:
+            columns[name] = np.array(values, dtype=np.float64)
+        else:
+            columns[name] = np.array([-1 if value is None else int(value) for value in values], dtype=np.int8)
+
+    ids = np.array(fields[0], dtype=np.int64)
+    row_versions = np.array([-1 if value is None else value for value in fields[1]], dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    return ids[order], row_versions[order], {name: column[order] for name, column in columns.items()}
+
+class ListingSnapshot:
+    """Columnar copy of the active listings at one data version, ordered by id.
+
+    A snapshot is never modified once built; a refresh builds a new one and
+    swaps it in, so searches can keep reading the old one meanwhile.
+    """
+
+    def __init__(self, version: int, ids, row_versions, columns: dict, dictionaries: dict, index: BitmapIndex):
+        self.version = version
+        self.ids = ids
+        self.row_versions = row_versions
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.index = index
+        self.built_at = datetime.utcnow()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, version: int, rows: list):
+        """Build from (id, row_version, *SNAPSHOT_COLUMNS) tuples; row_version may be None."""
+        dictionaries = {name: Dictionary() for name in CATEGORICAL_COLUMNS}
+        ids, row_versions, columns = encode_rows(rows, dictionaries)
+        index = BitmapIndex.build(ids, {name: columns[name] for name in INDEXED_COLUMNS})
+        return cls(version, ids, row_versions, columns, dictionaries, index)
+
+    def merged(self, version: int, keep, rows: list):
+        """A new snapshot with the rows at positions ``keep`` plus ``rows`` (new or changed listings).
+
+        The bitmap index is updated incrementally: every id that is not kept
+        (sold, deleted or changed) is removed and ``rows`` are added.
+        """
+        dictionaries = {name: dictionary.copy() for name, dictionary in self.dictionaries.items()}
+        fresh_ids, fresh_row_versions, fresh_columns = encode_rows(rows, dictionaries)
+        ids = np.concatenate([self.ids[keep], fresh_ids])
+        order = np.argsort(ids, kind="stable")
+        columns = {
+            name: np.concatenate([self.columns[name][keep], fresh_columns[name]])[order]
+            for name in SNAPSHOT_COLUMNS
+        }
+        row_versions = np.concatenate([self.row_versions[keep], fresh_row_versions])[order]
+
+        dropped = np.ones(len(self.ids), dtype=bool)
+        dropped[keep] = False
+        index = self.index.updated(
+            self.ids[dropped], fresh_ids, {name: fresh_columns[name] for name in INDEXED_COLUMNS}
+        )
+        return ListingSnapshot(version, ids[order], row_versions, columns, dictionaries, index)
+
+    def index_conditions(self, filters: dict) -> dict:
+        """The filters answered by the bitmap index, as column -> value codes."""
+        conditions = {}
+        for name in IN_FILTERS:
+            if filters.get(name):
+                conditions[name] = self.dictionaries[name].lookup(filters[name])
+        if filters.get("deal_rating"):
+            conditions["deal_rating"] = self.dictionaries["deal_rating"].lookup([filters["deal_rating"]])
+        for name in FLAG_COLUMNS:
+            if filters.get(name) is not None:
+                conditions[name] = [int(filters[name])]
+        return conditions
+
+    def column_mask(self, filters: dict):
+        """Boolean mask of the rows matching the filters the index does not cover, or None if there are none."""
+        mask = None
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        for name in EQUALS_FILTERS:
+            if filters.get(name) and name not in INDEXED_COLUMNS:
+                codes = self.dictionaries[name].lookup([filters[name]])
+                narrow(self.columns[name] == (codes[0] if codes else -2))
+        for name, (column, compare) in RANGE_FILTERS.items():
+            if filters.get(name):
+                narrow(compare(self.columns[column], filters[name]))
+        for name, (column, compare) in NOT_NONE_RANGE_FILTERS.items():
+            if filters.get(name) is not None:
+                narrow(compare(self.columns[column], filters[name]))
+        return mask
+
+    def match(self, filters: dict):
+        """Boolean mask of the rows matching ``filters``."""
+        mask = self.column_mask(filters)
+        if mask is None:
+            mask = np.ones(len(self.ids), dtype=bool)
+        selected = self.index.all_of(self.index_conditions(filters))
+        if selected is not None:
+            in_index = np.zeros(len(self.ids), dtype=bool)
+            in_index[np.searchsorted(self.ids, bitmap_ids(selected))] = True
+            mask &= in_index
+        return mask
+
+    def facets(self, filters: dict, facet_columns: list) -> dict:
+        """Per-value counts for ``facet_columns`` under ``filters``, each facet ignoring its own filter.
+
+        The filters shared by every facet are reduced to one bitmap; each
+        facet then ANDs in the other facets' bitmaps and counts its values
+        from intersection cardinalities.
+        """
+        shared = {name: value for name, value in filters.items() if name not in facet_columns}
+        facet_filters = {name: filters.get(name) for name in facet_columns}
+
+        mask = self.column_mask(shared)
+        base = self.index.all_ids if mask is None else to_bitmap(self.ids[mask])
+        selected = self.index.all_of(self.index_conditions(shared))
+        if selected is not None:
+            base = base & selected
+
+        facets = {}
+        for column in facet_columns:
+            others = self.index_conditions({name: value for name, value in facet_filters.items() if name != column})
+            narrowed = base & self.index.all_of(others) if others else base
+            values = self.dictionaries[column].values
+            facets[column] = sorted(
+                ({"value": values[code], "count": count} for code, count in self.index.counts(column, narrowed).items()),
+                key=lambda item: (-item["count"], str(item["value"]))
+            )
+        return facets
+
+    def search(self, filters: dict, sort_by, descending: bool, offset: int, limit: int, after=None):
+        """Ids of one page of listings matching ``filters`` and the number of matches.
+
+        Rows are ordered like get_all_car_listings: by id, or by (sort column
+        NULLS LAST, id) in the requested direction. ``after`` is a decoded
+        (sort value, id) cursor position.
+        """
+        positions = np.flatnonzero(self.match(filters))
+        total = len(positions)
+        ids = self.ids[positions]
+
+        if sort_by is None:
+            if after is not None:
+                positions = positions[np.searchsorted(ids, after[1], side="right"):]
+            return self.ids[positions[offset:offset + limit]].tolist(), total
+
+        values = self.columns[sort_by][positions]
+        if after is not None:
+            after_value, after_id = after
+            nulls = np.isnan(values)
+            if after_value is None:
+                seek = nulls & ((ids < after_id) if descending else (ids > after_id))
+            else:
+                if isinstance(after_value, datetime):
+                    after_value = to_micros(after_value)
+                if descending:
+                    seek = (values < after_value) | ((values == after_value) & (ids < after_id)) | nulls
+                else:
+                    seek = (values > after_value) | ((values == after_value) & (ids > after_id)) | nulls
+            positions, ids, values = positions[seek], ids[seek], values[seek]
+
+        # NULLs get +inf so they sort last in either direction.
+        keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+        tiebreak = -ids if descending else ids
+        wanted = offset + limit
+        if wanted < len(keys):
+            # Only the first ``wanted`` rows need a full sort; keep every row tied
+            # with the last of them so the id tiebreak stays exact.
+            kth = keys[np.argpartition(keys, wanted - 1)[wanted - 1]]
+            candidates = np.flatnonzero(keys <= kth)
+        else:
+            candidates = np.arange(len(keys))
+        ordered = candidates[np.lexsort((tiebreak[candidates], keys[candidates]))]
+        return ids[ordered[offset:offset + limit]].tolist(), total
+
+def load_snapshot(db: Session, previous: ListingSnapshot = None) -> ListingSnapshot:
+    """Read the active listings into a new snapshot.
+
+    On Postgres, when a previous snapshot exists, only the (id, xmin) pairs
+    are read in full; rows that are new or whose xmin changed are fetched
+    and merged with the unchanged rows of ``previous``.
+    """
+    # Read the version first: rows committed meanwhile only make the snapshot
+    # newer than its label, and the next bump refreshes it again.
+    version = get_data_version(db)
+    snapshot_columns = [getattr(CarListing, name) for name in SNAPSHOT_COLUMNS]
+    row_version = row_version_column(db)
+
+    if previous is None or row_version is None:
+        query = active_listings_query(db).add_columns(*snapshot_columns)
+        rows = [(row[0], row[1] if row_version is not None else None, *row[-len(SNAPSHOT_COLUMNS):]) for row in db.execute(query)]
+        return ListingSnapshot.from_rows(version, rows)
+
+    current = db.execute(active_listings_query(db)).all()
+    ids = np.array([row[0] for row in current], dtype=np.int64)
+    row_versions = np.array([row[1] for row in current], dtype=np.int64)
+
+    positions = np.minimum(np.searchsorted(previous.ids, ids), max(len(previous.ids) - 1, 0))
+    if len(previous.ids):
+        unchanged = (previous.ids[positions] == ids) & (previous.row_versions[positions] == row_versions)
+    else:
+        unchanged = np.zeros(len(ids), dtype=bool)
+
+    changed_ids = ids[~unchanged].tolist()
+    rows = []
+    for start in range(0, len(changed_ids), REFRESH_FETCH_BATCH):
+        batch = changed_ids[start:start + REFRESH_FETCH_BATCH]
+        query = select(CarListing.id, row_version, *snapshot_columns).where(CarListing.id.in_(batch))
+        rows.extend(tuple(row) for row in db.execute(query))
+    return previous.merged(version, positions[unchanged], rows)
+
+class SnapshotSearch:
+    """Keeps this worker's snapshot in step with the listings data version.
+
+    A search is served from the snapshot only when it was built at the
+    current data version; otherwise the caller falls back to SQL while a
+    background thread refreshes it.
+    """
+
+    def __init__(self, check_seconds: float = DATA_VERSION_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.snapshot = None
+        self.version = None
+        self.checked_at = 0.0
+        self.refreshing = False
+        self.last_refresh_ms = None
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def supports(filters: dict) -> bool:
+        return filters.get("sold") is False and not any(filters.get(name) for name in SQL_ONLY_FILTERS)
+
+    def current_version(self, db: Session) -> int:
+        now = time.monotonic()
+        if self.version is None or now - self.checked_at >= self.check_seconds:
+            self.version = get_data_version(db)
+            self.checked_at = now
+        return self.version
+
+    def get(self, db: Session, filters: dict):
+        """The snapshot to answer ``filters`` from, or None to use SQL."""
+        if SEARCH_BACKEND != "snapshot" or not self.supports(filters):
+            return None
+        snapshot = self.snapshot
+        # Versions only grow; a snapshot newer than this worker's last check is still current.
+        if snapshot is not None and snapshot.version >= self.current_version(db):
+            return snapshot
+        self.start_refresh()
+        return None
+
+    def start_refresh(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, name="listing-snapshot-refresh", daemon=True).start()
+
+    def refresh(self):
+        from app.database import SessionLocal
+        started = time.perf_counter()
+        try:
+            with SessionLocal() as db:
+                self.snapshot = load_snapshot(db, self.snapshot)
+            self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Eroare la reîncărcarea snapshot-ului de căutare: {e}")
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "backend": SEARCH_BACKEND,
+            "version": snapshot.version if snapshot else None,
+            "rows": len(snapshot) if snapshot else 0,
+            "built_at": snapshot.built_at.isoformat() if snapshot else None,
+            "memory_bytes": sum(column.nbytes for column in snapshot.columns.values()) + snapshot.ids.nbytes if snapshot else 0,
+            "bitmaps": sum(len(column) for column in snapshot.index.bitmaps.values()) if snapshot else 0,
+            "refreshing": self.refreshing,
+            "last_refresh_ms": self.last_refresh_ms,
+            "last_error": self.last_error
+        }
+
+snapshot_search = SnapshotSearch()
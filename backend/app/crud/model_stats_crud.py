@@ -0,0 +1,122 @@
+from sqlalchemy import Integer, case, cast, extract, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from app.models.models import CarListing
+
+PRICE_BRACKETS = 8
+# Bracket width when every listing has the same price.
+FLAT_BRACKET_SIZE = 1000
+
+def included_listings() -> list:
+    """Suspicious-price and damaged listings are left out of the model statistics."""
+    return [
+        (CarListing.suspicious_price != True) | (CarListing.suspicious_price == None),
+        (CarListing.damaged != True) | (CarListing.damaged == None)
+    ]
+
+def model_stats_filters(brand: str, model: str) -> list:
+    return [CarListing.brand == brand, CarListing.model == model, *included_listings()]
+
+def sale_days(db: Session):
+    """Whole days from created_at to sold_detected_at, floored and clamped at 0 like max(0, timedelta.days)."""
+    if db.get_bind().dialect.name == "postgresql":
+        seconds = extract("epoch", CarListing.sold_detected_at - CarListing.created_at)
+        return func.greatest(0, func.floor(seconds / 86400))
+    # SQLite: millisecond difference; truncating toward zero only differs from
+    # flooring for negative spans, which are clamped to 0 anyway.
+    millis = cast(func.round((func.julianday(CarListing.sold_detected_at) - func.julianday(CarListing.created_at)) * 86400000), Integer)
+    return func.max(0, millis // 86400000)
+
+def price_bucket(db: Session, bounds: list):
+    """Index of the bracket a price falls in: i for bounds[i - 1] <= price < bounds[i], 0 below, len(bounds) above."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.width_bucket(CarListing.price, postgresql.array(bounds))
+    return case(*[(CarListing.price < bound, i) for i, bound in enumerate(bounds)], else_=len(bounds))
+
+def empty_model_stats() -> dict:
+    return {
+        "totalCount": 0,
+        "averagePrice": 0,
+        "averageMileage": 0,
+        "averageYear": 0,
+        "soldCount": 0,
+        "avgSaleTime": None,
+        "priceDistribution": [],
+        "yearDistribution": [],
+        "fuelTypeDistribution": [],
+        "transmissionDistribution": []
+    }
+
+def value_distribution(db: Session, column, filters: list) -> list:
+    # First-seen order, as when the listings were tallied in table order.
+    rows = db.query(column, func.count()).filter(*filters, column != None, column != "").group_by(column).order_by(func.min(CarListing.id)).all()
+    return [{"type": value, "count": count} for value, count in rows]
+
+def get_model_stats(db: Session, brand: str, model: str) -> dict:
+    """Listing statistics for one brand / model, computed with aggregate queries.
+
+    Only aggregates are read, so memory use does not grow with the number
+    of listings.
+    """
+    filters = model_stats_filters(brand, model)
+    sold = CarListing.sold == True
+    with_sale_data = sold & (CarListing.created_at != None) & (CarListing.sold_detected_at != None)
+
+    summary = db.query(
+        func.count(),
+        func.sum(CarListing.price), func.count(CarListing.price),
+        func.min(CarListing.price), func.max(CarListing.price),
+        func.sum(CarListing.mileage), func.count(CarListing.mileage),
+        func.sum(CarListing.year), func.count(CarListing.year),
+        func.min(CarListing.year), func.max(CarListing.year),
+        func.count().filter(sold),
+        func.sum(sale_days(db)).filter(with_sale_data), func.count().filter(with_sale_data)
+    ).filter(*filters).one()
+    (total_count, price_sum, price_count, min_price, max_price, mileage_sum, mileage_count,
+     year_sum, year_count, min_year, max_year, sold_count, sale_days_sum, sale_count) = summary
+
+    if not total_count:
+        return empty_model_stats()
+
+    avg_price = price_sum / price_count if price_count else 0
+    avg_mileage = mileage_sum / mileage_count if mileage_count else 0
+    avg_year = round(year_sum / year_count) if year_count else 0
+    avg_sale_time = round(int(sale_days_sum) / sale_count) if sale_count else None
+
+    if not price_count:
+        min_price = max_price = 0
+    price_range = max_price - min_price
+    bracket_size = price_range / PRICE_BRACKETS if price_range > 0 else FLAT_BRACKET_SIZE
+    bounds = [min_price + (i * bracket_size) for i in range(PRICE_BRACKETS + 1)]
+
+    bucket_counts = {}
+    if price_count:
+        bucket = price_bucket(db, bounds)
+        bucket_counts = dict(db.query(bucket, func.count()).filter(*filters, CarListing.price != None).group_by(bucket).all())
+    price_distribution = [
+        {
+            "range": f"€{int(bounds[i]):,} - €{int(bounds[i + 1]):,}",
+            "count": bucket_counts.get(i + 1, 0),
+            "minPrice": bounds[i],
+            "maxPrice": bounds[i + 1]
+        }
+        for i in range(PRICE_BRACKETS)
+    ]
+
+    year_counts = dict(db.query(CarListing.year, func.count()).filter(*filters, CarListing.year != None).group_by(CarListing.year).all())
+    if not year_count:
+        min_year = max_year = 0
+    year_distribution = [{"year": year, "count": year_counts.get(year, 0)} for year in range(min_year, max_year + 1)]
+
+    return {
+        "totalCount": total_count,
+        "averagePrice": avg_price,
+        "averageMileage": avg_mileage,
+        "averageYear": avg_year,
+        "soldCount": sold_count,
+        "avgSaleTime": avg_sale_time,
+        "priceDistribution": price_distribution,
+        "yearDistribution": year_distribution,
+        "fuelTypeDistribution": value_distribution(db, CarListing.fuel_type, filters),
+        "transmissionDistribution": value_distribution(db, CarListing.transmission, filters)
+    }
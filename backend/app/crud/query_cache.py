@@ -0,0 +1,166 @@
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.data_version_crud import get_data_version
+from app.responses import encode_json
+from dotenv import load_dotenv
+import json
+import os
+import threading
+import time
+
+load_dotenv()
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+# How often a worker re-reads the data version, i.e. how long a finished ingest
+# can still be served from the cache.
+DATA_VERSION_CHECK_SECONDS = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "1"))
+
+_data_caches = []
+
+class TTLCache:
+    """Small thread-safe in-process LRU cache whose entries expire ``ttl_seconds`` after being stored."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024, clear_on_data_change: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        if clear_on_data_change:
+            _data_caches.append(self)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.max_entries:
+                for expired in [k for k, (expires_at, _) in self.entries.items() if expires_at <= now]:
+                    del self.entries[expired]
+            self.entries[key] = (now + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class RedisCache:
+    """Response cache shared by every API worker, stored in Redis (or a compatible server)."""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "carstat:response:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + key)
+        except self.errors as e:
+            print(f"Response cache indisponibil: {e}")
+            return None
+
+    def set(self, key, value: bytes):
+        try:
+            self.client.set(self.prefix + key, value, ex=int(self.ttl_seconds))
+        except self.errors as e:
+            print(f"Response cache indisponibil: {e}")
+
+    def clear(self):
+        # Entries are keyed by data version, so old ones simply expire; this is for manual resets.
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+def create_response_cache(backend: str = RESPONSE_CACHE_BACKEND):
+    if backend == "memory":
+        return TTLCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES, clear_on_data_change=True)
+    if backend == "redis":
+        return RedisCache(RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL_SECONDS)
+    if backend == "none":
+        return None
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+
+response_cache = create_response_cache()
+
+def filter_signature(filters: dict) -> str:
+    """Canonical form of a filter set, so equivalent requests share a cache entry."""
+    normalized = {}
+    for name, value in filters.items():
+        if value is None or value == "" or value == []:
+            continue
+        if isinstance(value, list):
+            value = sorted(set(value))
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif name == "search":
+            value = value.lower()
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+def clear_data_caches():
+    for cache in _data_caches:
+        cache.clear()
+
+class DataVersionWatch:
+    """The listings data version as last read by this worker, re-read at most every ``check_seconds``."""
+
+    def __init__(self, check_seconds: float = DATA_VERSION_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    async def current(self, db: AsyncSession) -> int:
+        now = time.monotonic()
+        if self.version is not None and now - self.checked_at < self.check_seconds:
+            return self.version
+        version = await db.run_sync(get_data_version)
+        with self.lock:
+            if self.version is not None and version != self.version:
+                # Entries keyed by the old version can no longer be hit; free them now.
+                clear_data_caches()
+            self.version = version
+            self.checked_at = now
+        return version
+
+data_version = DataVersionWatch()
+
+def cached_response(endpoint: str, skip=None):
+    """Caches an async route's encoded JSON body under its query parameters and the current data version.
+
+    The route must take its AsyncSession as ``db``; ``skip(params)`` can opt a
+    request out, e.g. when the response depends on the user.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(**kwargs):
+            params = {name: value for name, value in kwargs.items() if name != "db"}
+            if response_cache is None or (skip and skip(params)):
+                return await func(**kwargs)
+
+            key = f"{await data_version.current(kwargs['db'])}:{endpoint}:{filter_signature(params)}"
+            body = response_cache.get(key)
+            if body is None:
+                result = await func(**kwargs)
+                body = result.body if isinstance(result, Response) else encode_json(result)
+                response_cache.set(key, body)
+            return Response(body, media_type="application/json")
+        return wrapper
+    return decorator
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from scipy.spatial import cKDTree
+from app.models.models import CarListing
+from dotenv import load_dotenv
+import numpy as np
+import os
+import time
+
+load_dotenv()
+
+# Feature weights. Numeric features are z-scored within the (brand, model)
+# group, so a weight of 1 makes one standard deviation one unit of distance;
+# a categorical mismatch costs sqrt(2) * weight.
+NUMERIC_FEATURES = {"price": 2.0, "year": 1.5, "mileage": 1.0, "engine_capacity": 1.0, "engine_power": 1.0}
+CATEGORICAL_FEATURES = {"fuel_type": 1.5, "transmission": 1.0, "drive_type": 0.5}
+FEATURE_COLUMNS = list(NUMERIC_FEATURES) + list(CATEGORICAL_FEATURES)
+
+# Length of the lists stored by app.analytics.precompute_similar.
+PRECOMPUTED_SIMILAR = 12
+# Trees of the least recently used models are dropped beyond this many.
+SIMILARITY_INDEX_MAX_MODELS = int(os.getenv("SIMILARITY_INDEX_MAX_MODELS", "256"))
+# A tree built at an older data version is kept for this long before being
+# rebuilt, so ingest bumps do not rebuild it on every request; listings sold
+# meanwhile are filtered out when the results are loaded.
+SIMILARITY_INDEX_REFRESH_SECONDS = float(os.getenv("SIMILARITY_INDEX_REFRESH_SECONDS", "300"))
+
+def similar_candidates() -> list:
+    """Listings that can be suggested as similar: still for sale and not flagged as suspicious."""
+    return [
+        CarListing.sold == False,
+        (CarListing.suspicious_price != True) | (CarListing.suspicious_price == None)
+    ]
+
+def model_rows_query(brand: str, model: str):
+    columns = [getattr(CarListing, name) for name in FEATURE_COLUMNS]
+    return select(CarListing.id, *columns).where(CarListing.brand == brand, CarListing.model == model, *similar_candidates())
+
+def load_model_rows(db: Session, brand: str, model: str) -> list:
+    return db.execute(model_rows_query(brand, model)).all()
+
+class ModelNeighbours:
+    """KD-tree over the feature vectors of one (brand, model)'s candidate listings."""
+
+    def __init__(self, rows: list, version: int = None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+
+        columns = list(zip(*rows)) if rows else [()] * (1 + len(FEATURE_COLUMNS))
+        self.means, self.scales, self.vocabulary = {}, {}, {}
+        features = []
+        for name, values in zip(FEATURE_COLUMNS, columns[1:]):
+            if name in NUMERIC_FEATURES:
+                values = np.array(values, dtype=np.float64)
+                present = values[~np.isnan(values)]
+                self.means[name] = float(present.mean()) if len(present) else 0.0
+                scale = float(present.std()) if len(present) else 0.0
+                self.scales[name] = scale if scale > 0 else 1.0
+                scaled = (values - self.means[name]) / self.scales[name] * NUMERIC_FEATURES[name]
+                features.append(np.nan_to_num(scaled, nan=0.0)[:, None])
+            else:
+                self.vocabulary[name] = sorted({value for value in values if value is not None})
+                values = np.array(values, dtype=object)
+                one_hot = values[:, None] == np.array(self.vocabulary[name], dtype=object)[None, :]
+                features.append(one_hot.reshape(len(values), -1) * CATEGORICAL_FEATURES[name])
+
+        self.vectors = np.hstack(features) if rows else np.empty((0, 0))
+        self.tree = cKDTree(self.vectors) if len(rows) else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vector(self, car) -> np.ndarray:
+        """Weighted feature vector of ``car`` (a mapping of FEATURE_COLUMNS); missing numbers count as the group mean."""
+        features = []
+        for name, weight in NUMERIC_FEATURES.items():
+            value = car.get(name)
+            features.append(0.0 if value is None else (value - self.means[name]) / self.scales[name] * weight)
+        for name, weight in CATEGORICAL_FEATURES.items():
+            features.extend(weight if value == car.get(name) else 0.0 for value in self.vocabulary[name])
+        return np.array(features, dtype=np.float64)
+
+    def nearest(self, car, k: int, exclude_id: int = None) -> list:
+        """Ids of the ``k`` candidates closest to ``car``, nearest first, leaving out ``exclude_id``."""
+        if self.tree is None or k <= 0:
+            return []
+        distances, positions = self.tree.query(self.vector(car), k=min(k + 1, len(self)))
+        ids = self.ids[np.atleast_1d(positions)].tolist()
+        return [car_id for car_id in ids if car_id != exclude_id][:k]
+
+class SimilarityIndex:
+    """This worker's ModelNeighbours, built on first use and rebuilt after the data version changes.
+
+    Rows are read through the request's AsyncSession and trees are built in
+    the thread pool, so neither blocks the event loop; only the event loop
+    touches ``groups``.
+    """
+
+    def __init__(self, max_models: int = SIMILARITY_INDEX_MAX_MODELS, refresh_seconds: float = SIMILARITY_INDEX_REFRESH_SECONDS):
+        self.max_models = max_models
+        self.refresh_seconds = refresh_seconds
+        self.groups = OrderedDict()
+
+    def is_current(self, group: ModelNeighbours, version: int) -> bool:
+        return group.version == version or time.monotonic() - group.built_at < self.refresh_seconds
+
+    async def group(self, db: AsyncSession, brand: str, model: str, version: int) -> ModelNeighbours:
+        key = (brand, model)
+        group = self.groups.get(key)
+        if group is None or not self.is_current(group, version):
+            rows = (await db.execute(model_rows_query(brand, model))).all()
+            group = await run_in_threadpool(ModelNeighbours, rows, version)
+            self.groups[key] = group
+        self.groups.move_to_end(key)
+        while len(self.groups) > self.max_models:
+            self.groups.popitem(last=False)
+        return group
+
+    async def similar_car_ids(self, db: AsyncSession, car_id: int, car, limit: int, version: int) -> list:
+        if car.get("brand") is None or car.get("model") is None:
+            return []
+        group = await self.group(db, car["brand"], car["model"], version)
+        return group.nearest(car, limit, exclude_id=car_id)
+
+    def status(self) -> dict:
+        groups = list(self.groups.values())
+        return {
+            "models": len(groups),
+            "max_models": self.max_models,
+            "listings": sum(len(group) for group in groups)
+        }
+
+similarity_index = SimilarityIndex()
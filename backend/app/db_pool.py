@@ -0,0 +1,159 @@
+from sqlalchemy import exc, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from dotenv import load_dotenv
+import os
+import threading
+import time
+
+load_dotenv()
+
+# Each process type gets its own pool limits, so a combined spider + batch +
+# API run stays within Postgres' max_connections. An API worker has two
+# engines, sync ("api") and async ("api_async"), which split its budget of
+# 20 connections. Any setting can be
+# overridden with DB_<PROFILE>_<SETTING>, e.g. DB_API_POOL_SIZE=20 or
+# DB_SPIDER_STATEMENT_TIMEOUT_MS=0 (0 disables the timeout).
+POOL_PROFILES = {
+    "api": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 15000,
+    },
+    "api_async": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 15000,
+    },
+    "spider": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 60000,
+    },
+    "batch": {
+        "pool_size": 2,
+        "max_overflow": 2,
+        "pool_timeout": 60,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 0,
+    },
+}
+
+# The API is the default; scrapy's settings select "spider" and
+# update_all_car_data.bat sets DB_PROFILE=batch for the analytics scripts
+# (set it as well when running them by hand).
+DB_PROFILE = os.getenv("DB_PROFILE", "api")
+
+def pool_settings(profile: str = DB_PROFILE) -> dict:
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {profile}")
+    settings = dict(POOL_PROFILES[profile])
+    for name, default in settings.items():
+        value = os.getenv(f"DB_{profile.upper()}_{name.upper()}")
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            settings[name] = value.lower() in ("1", "true", "yes")
+        else:
+            settings[name] = int(value)
+    return settings
+
+class PoolStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": round(self.total_wait / waits * 1000, 3) if waits else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+class TimedCheckout:
+    """Pool mixin recording how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def engine_options(url, profile: str = DB_PROFILE, async_driver: bool = False) -> dict:
+    """create_engine / create_async_engine keyword arguments for ``profile``."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default pool.
+        return {}
+
+    settings = pool_settings(profile)
+    options = {
+        "poolclass": TimedAsyncQueuePool if async_driver else TimedQueuePool,
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+        "pool_timeout": settings["pool_timeout"],
+        "pool_recycle": settings["pool_recycle"],
+        "pool_pre_ping": settings["pool_pre_ping"],
+    }
+
+    timeout = settings["statement_timeout_ms"]
+    if backend == "postgresql" and timeout:
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # QueuePool.overflow() is negative while the pool has not been filled yet
+            overflow=max(0, pool.overflow()),
+        )
+    if isinstance(pool, TimedCheckout):
+        status.update(pool.stats.snapshot())
+    return status
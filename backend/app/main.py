@@ -9,6 +9,7 @@ from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
 from app.routers import saved_search_router
 from app.routers import analytics_router
+from app.routers import internal_router
 # from app.routers import estimation_history_router
 # from app.routers import estimation_router
 import os
@@ -33,6 +34,8 @@ app.include_router(saved_search_router.router)
 app.include_router(auth_router)
 app.include_router(google_auth_router)
 app.include_router(analytics_router.router)
+if internal_router.INTERNAL_ENDPOINTS:
+    app.include_router(internal_router.router)
 # app.include_router(estimation_router.router)
 # app.include_router(estimation_history_router.router)
 
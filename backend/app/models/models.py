@@ -6,6 +6,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy import UniqueConstraint
 from sqlalchemy import Boolean
 from sqlalchemy import JSON
+from sqlalchemy import Index
 
 class User(Base):
     __tablename__ = "users"
@@ -19,6 +20,13 @@ class User(Base):
 
 class CarListing(Base):
     __tablename__ = "car_listings"
+    __table_args__ = (
+        Index("ix_car_listings_price_id", "price", "id"),
+        Index("ix_car_listings_year_id", "year", "id"),
+        Index("ix_car_listings_mileage_id", "mileage", "id"),
+        Index("ix_car_listings_created_at_id", "created_at", "id"),
+        Index("ix_car_listings_engine_power_id", "engine_power", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
@@ -75,6 +83,22 @@ class CarListing(Base):
     suspicious_price = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class ModelStatsRollup(Base):
+    __tablename__ = "model_stats_rollup"
+
+    brand = Column(String, primary_key=True)
+    model = Column(String, primary_key=True)
+    listing_count = Column(Integer, default=0)
+    stats = Column(Text, nullable=False)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
+class SimilarListings(Base):
+    __tablename__ = "similar_listings"
+
+    car_id = Column(Integer, primary_key=True)
+    similar_ids = Column(Text, nullable=False)
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
 class Favorite(Base):
     __tablename__ = "favorites"
     __table_args__ = (UniqueConstraint("user_id", "car_id", name="unique_user_car"),)
@@ -123,4 +147,11 @@ class IncompleteDataStats(Base):
     no_fuel_type = Column(Integer, default=0)
     no_transmission = Column(Integer, default=0)
     no_engine_capacity = Column(Integer, default=0)
-    last_update = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    last_update = Column(DateTime, default=datetime.utcnow)
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
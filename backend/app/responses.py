@@ -0,0 +1,13 @@
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import orjson
+
+def encode_json(content) -> bytes:
+    # Values orjson has no encoder for (Decimal from raw SQL, pydantic models) fall back to FastAPI's encoder.
+    return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+class FastJSONResponse(JSONResponse):
+    """orjson-encoded response. Returning it from a route also skips FastAPI's response_model validation."""
+
+    def render(self, content) -> bytes:
+        return encode_json(content)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.dependencies import get_db
+from app.dependencies import get_async_db
 from app.models.models import CarListing
+from app.crud.query_cache import cached_response
 from sqlalchemy import func
 import json
 from datetime import datetime, timedelta
@@ -787,8 +788,9 @@ router = APIRouter(prefix="/analytics", tags=["Analytics"])
 #     return brand_reliability
 
 @router.get("/available-brands")
-def get_available_brands(db: Session = Depends(get_db)):
-    brands = db.execute(text("""
+@cached_response("available-brands")
+async def get_available_brands(db: AsyncSession = Depends(get_async_db)):
+    brands = (await db.execute(text("""
         SELECT brand
         FROM (
             SELECT brand, COUNT(*) as brand_count
@@ -798,21 +800,22 @@ def get_available_brands(db: Session = Depends(get_db)):
             HAVING COUNT(*) > 10
         ) as brand_counts
         ORDER BY brand_counts.brand_count DESC
-    """)).fetchall()
+    """))).fetchall()
     
     return [brand[0] for brand in brands]
 
 @router.get("/available-models/{brand}")
-def get_available_models(brand: str, db: Session = Depends(get_db)):
-    models = db.execute(text(f"""
+@cached_response("available-models")
+async def get_available_models(brand: str, db: AsyncSession = Depends(get_async_db)):
+    models = (await db.execute(text("""
         SELECT model
         FROM car_listings
-        WHERE brand = '{brand}'
+        WHERE brand = :brand
         AND model IS NOT NULL
         GROUP BY model
         HAVING COUNT(*) > 5
         ORDER BY COUNT(*) DESC
-    """)).fetchall()
+    """), {"brand": brand})).fetchall()
     
     return [model[0] for model in models]
 
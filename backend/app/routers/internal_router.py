@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from app.database import engine
+from app.async_database import ASYNC_DB_PROFILE, async_engine
+from app.db_pool import DB_PROFILE, pool_settings, pool_status
+from app.crud.listing_snapshot import snapshot_search
+from app.crud.similarity_index import similarity_index
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Operational endpoints, unauthenticated: main.py only mounts them when
+# INTERNAL_ENDPOINTS is set, which should be limited to trusted deployments.
+INTERNAL_ENDPOINTS = os.getenv("INTERNAL_ENDPOINTS", "").lower() in ("1", "true", "yes")
+
+router = APIRouter(prefix="/internal", tags=["Internal"], include_in_schema=False)
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    return {
+        "sync": {"profile": DB_PROFILE, "settings": pool_settings(DB_PROFILE), **pool_status(engine)},
+        "async": {"profile": ASYNC_DB_PROFILE, "settings": pool_settings(ASYNC_DB_PROFILE), **pool_status(async_engine)}
+    }
+
+@router.get("/search-snapshot")
+async def search_snapshot_status():
+    return snapshot_search.status()
+
+@router.get("/similarity-index")
+async def similarity_index_status():
+    return similarity_index.status()
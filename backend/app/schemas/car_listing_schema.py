@@ -61,3 +61,28 @@ class CarListingOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+class CarListingCard(BaseModel):
+    id: int
+    title: str
+    brand: str
+    model: str
+    price: float
+    year: Optional[int]
+    mileage: Optional[int]
+    fuel_type: Optional[str]
+    transmission: Optional[str]
+    engine_capacity: Optional[int]
+    engine_power: Optional[int]
+    drive_type: Optional[str]
+    generation: Optional[str]
+    location: Optional[str]
+    image: Optional[str] = None
+    deal_rating: Optional[str]
+    estimated_price: Optional[float]
+    quality_score: Optional[int]
+    suspicious_price: Optional[bool]
+    right_hand_drive: Optional[bool]
+    sold: Optional[bool]
+    created_at: datetime
+    is_favorite: Optional[bool] = False
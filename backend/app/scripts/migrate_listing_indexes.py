@@ -0,0 +1,39 @@
+from sqlalchemy import text
+from app.database import engine
+from app.models.models import CarListing
+
+def create_index_sql(index, preparer) -> str:
+    columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    return (f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {preparer.quote(index.name)} "
+            f"ON {preparer.format_table(index.table)} ({columns})")
+
+def create_listing_indexes(conn):
+    """Create the car_listings indexes declared on the model that the table does not have yet.
+
+    create_all only builds indexes together with a new table, so indexes
+    added to CarListing later (e.g. the (sort column, id) cursor indexes)
+    are created here.
+    """
+    indexes = sorted(CarListing.__table__.indexes, key=lambda index: index.name)
+    if conn.dialect.name != "postgresql":
+        for index in indexes:
+            index.create(bind=conn, checkfirst=True)
+        return indexes
+
+    # CONCURRENTLY keeps the table writable while the indexes build.
+    for index in indexes:
+        conn.execute(text(create_index_sql(index, conn.dialect.identifier_preparer)))
+    conn.execute(text("ANALYZE car_listings"))
+    return indexes
+
+def migrate_listing_indexes():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.dialect.name == "postgresql":
+            # Index builds on a large table can outlast any pool profile's statement timeout.
+            conn.execute(text("SET statement_timeout = 0"))
+        indexes = create_listing_indexes(conn)
+    print(f"Indexurile car_listings sunt create ({len(indexes)} verificate).")
+
+if __name__ == "__main__":
+    migrate_listing_indexes()
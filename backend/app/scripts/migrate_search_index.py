@@ -0,0 +1,80 @@
+from sqlalchemy import text
+from app.database import engine
+from app.crud.car_search_crud import SEARCH_VECTOR_SQL, BRAND_MODEL_TRGM_SQL
+from tqdm import tqdm
+
+BACKFILL_BATCH_ROWS = 5000
+
+def install_search_trigger(conn):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text("ALTER TABLE car_listings ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION car_listings_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row="NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text("DROP TRIGGER IF EXISTS car_listings_search_vector_trigger ON car_listings"))
+    conn.execute(text("""
+        CREATE TRIGGER car_listings_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF brand, model, title, description ON car_listings
+        FOR EACH ROW EXECUTE FUNCTION car_listings_search_vector_update()
+    """))
+
+def backfill_search_vectors(conn, rebuild: bool = False) -> int:
+    """Fill search_vector in id ranges, committing each batch so the table is never locked for long."""
+    min_id, max_id = conn.execute(text("SELECT min(id), max(id) FROM car_listings")).one()
+    if min_id is None:
+        return 0
+
+    only_missing = "" if rebuild else " AND search_vector IS NULL"
+    updated = 0
+    with tqdm(total=max_id - min_id + 1, desc="Backfill search_vector") as progress:
+        for start in range(min_id, max_id + 1, BACKFILL_BATCH_ROWS):
+            end = start + BACKFILL_BATCH_ROWS
+            result = conn.execute(
+                text(f"UPDATE car_listings SET search_vector = {SEARCH_VECTOR_SQL.format(row='')} "
+                     f"WHERE id >= :start AND id < :end{only_missing}"),
+                {"start": start, "end": end}
+            )
+            updated += result.rowcount
+            progress.update(min(end, max_id + 1) - start)
+    return updated
+
+def create_search_indexes(conn):
+    # CONCURRENTLY keeps the table writable while the indexes build.
+    conn.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_car_listings_search_vector "
+        "ON car_listings USING gin (search_vector)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_car_listings_brand_model_trgm "
+        f"ON car_listings USING gin (({BRAND_MODEL_TRGM_SQL.format(row='')}) gin_trgm_ops)"
+    ))
+    conn.execute(text("ANALYZE car_listings"))
+
+def migrate_search_index(rebuild: bool = False):
+    if engine.dialect.name != "postgresql":
+        print("Căutarea full-text necesită PostgreSQL; pe alte baze se folosește în continuare ILIKE.")
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # The backfill and index builds can outlast any pool profile's statement timeout.
+        conn.execute(text("SET statement_timeout = 0"))
+        install_search_trigger(conn)
+        print("Coloana search_vector și trigger-ul sunt instalate.")
+
+        updated = backfill_search_vectors(conn, rebuild)
+        print(f"Backfill: {updated:,} anunțuri actualizate.")
+
+        create_search_indexes(conn)
+        print("Indexurile GIN (full-text și trigram) sunt create.")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="recalculează search_vector pentru toate anunțurile")
+    args = parser.parse_args()
+    migrate_search_index(rebuild=args.rebuild)
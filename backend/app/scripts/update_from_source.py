@@ -7,10 +7,13 @@ import concurrent.futures
 from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright, Error as PlaywrightError
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import SessionLocal, engine
 from app.models.models import CarListing
+from app.crud.data_version_crud import ThrottledVersionBump
 
 progress_file = os.path.join(os.path.dirname(__file__), "progress_tracker.txt")
+# One per process; the parallel workers each publish their own changes.
+data_version = ThrottledVersionBump()
 
 def get_progress():
     if os.path.exists(progress_file):
@@ -205,10 +208,12 @@ def update_car_from_olx(page, car: CarListing, db: Session):
     # sold
     if "404" in page.title().lower() or "acest anunț nu mai este activ" in content:
         car.sold = True
+        car.sold_detected_at = datetime.now()
         updated = True
 
     if updated:
         try:
+            data_version.changed(db)
             db.commit()
         except Exception as e:
             db.rollback()
@@ -330,10 +335,12 @@ def update_car_from_autovit(page, car: CarListing, db: Session):
 
     if "404" in page.title().lower() or "anunțul nu mai este disponibil" in content.lower():
         car.sold = True
+        car.sold_detected_at = datetime.now()
         updated = True
 
     if updated:
         try:
+            data_version.changed(db)
             db.commit()
         except Exception as e:
             db.rollback()
@@ -341,6 +348,8 @@ def update_car_from_autovit(page, car: CarListing, db: Session):
             
 def process_car_batch(car_batch, browser_index=0):
     import os
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
     db = SessionLocal()
     last_car_id = None
     progress_file = os.path.join(os.path.dirname(__file__), f"progress_batch_{browser_index}.txt")
@@ -366,6 +375,7 @@ def process_car_batch(car_batch, browser_index=0):
                 db.rollback()
 
         browser.close()
+    data_version.finish(db)
     db.close()
 
     if last_car_id is not None:
@@ -453,6 +463,7 @@ def run_update_sequential():
             time.sleep(1)
 
         browser.close()
+    data_version.finish(db)
     db.close()
 
 if __name__ == "__main__":
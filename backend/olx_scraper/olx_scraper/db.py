@@ -5,3 +5,22 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "a
 
 from app.database import SessionLocal
 from app.models.models import CarListing
+from app.analytics.model_stats_rollup import refresh_changed_model_stats_rollups
+
+def publish_spider_changes(db, data_version, started_at):
+    """End of a spider run: refresh the model stats rollups of models changed since ``started_at``, then publish the last data version bump.
+
+    The rollups go first, so the API does not cache the old stats under the new version.
+    """
+    try:
+        refreshed = refresh_changed_model_stats_rollups(db, started_at)
+        print(f"Rollup-uri statistici modele actualizate: {refreshed}")
+    except Exception as e:
+        print(f"Eroare la actualizarea rollup-urilor statistici modele: {e}")
+        db.rollback()
+
+    try:
+        data_version.finish(db)
+    except Exception as e:
+        print(f"Eroare la publicarea versiunii datelor: {e}")
+        db.rollback()
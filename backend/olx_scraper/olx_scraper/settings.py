@@ -7,6 +7,11 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
+# Spiders share the database with the API; use the small "spider" pool profile (app/db_pool.py).
+os.environ.setdefault("DB_PROFILE", "spider")
+
 BOT_NAME = "olx_scraper"
 
 SPIDER_MODULES = ["olx_scraper.spiders"]
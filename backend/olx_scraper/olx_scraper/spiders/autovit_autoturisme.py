@@ -1,6 +1,9 @@
 import scrapy
 from app.models.models import CarListing, IncompleteDataStats
 from app.database import SessionLocal
+from app.analytics.generation_spans import load_generation_spans
+from app.crud.data_version_crud import ThrottledVersionBump
+from olx_scraper.db import publish_spider_changes
 from datetime import datetime
 import json
 import re
@@ -41,6 +44,21 @@ class AutovitAutoturismeSpider(scrapy.Spider):
         self.current_page = 1
         self.incomplete_reasons = {}
         self.increment_runs_counter("autovit")
+        self.generation_spans = self.load_generation_index()
+        self.data_version = ThrottledVersionBump()
+        self.started_at = datetime.now()
+
+    def load_generation_index(self):
+        db = SessionLocal()
+        try:
+            spans = load_generation_spans(db)
+            print(f"Loaded generation spans for {len(spans.models)} models")
+            return spans
+        except Exception as e:
+            print(f"Error loading generation spans: {e}")
+            return None
+        finally:
+            db.close()
 
     def increment_runs_counter(self, source):
         db = SessionLocal()
@@ -89,6 +107,7 @@ class AutovitAutoturismeSpider(scrapy.Spider):
                 print(f"   - {reason}: {count}")
                 
         db = SessionLocal()
+        publish_spider_changes(db, self.data_version, self.started_at)
         try:
             stats = db.query(IncompleteDataStats).filter_by(source=self.name.split("_")[0]).first()
             if stats:
@@ -472,6 +491,7 @@ class AutovitAutoturismeSpider(scrapy.Spider):
                         existing.price = price
                         existing.price_history = json.dumps(history)
                         existing.created_at = created_at
+                        self.data_version.changed(session)
                         session.commit()
                         print(f"Updated price for: {source_url}")
                     except Exception as e:
@@ -482,6 +502,9 @@ class AutovitAutoturismeSpider(scrapy.Spider):
                 print(f"Duplicate ad: {source_url}")
                 return
 
+            if not generation and self.generation_spans:
+                generation = self.generation_spans.lookup(brand, model, year)
+
             car = CarListing(
                 title=title,
                 brand=brand,
@@ -533,6 +556,7 @@ class AutovitAutoturismeSpider(scrapy.Spider):
             )
 
             session.add(car)
+            self.data_version.changed(session)
             session.commit()
             self.valid_cars += 1
             self.increment_valid_cars_counter("autovit")
@@ -1,6 +1,9 @@
 import scrapy
 from app.models.models import CarListing, IncompleteDataStats
 from app.database import SessionLocal
+from app.analytics.generation_spans import load_generation_spans
+from app.crud.data_version_crud import ThrottledVersionBump
+from olx_scraper.db import publish_spider_changes
 import json
 from datetime import datetime, timedelta
 import re
@@ -36,6 +39,21 @@ class OlxAutoturismeSpider(scrapy.Spider):
         self.current_page = 1
         self.incomplete_reasons = {}
         self.increment_runs_counter("olx")
+        self.generation_spans = self.load_generation_index()
+        self.data_version = ThrottledVersionBump()
+        self.started_at = datetime.now()
+
+    def load_generation_index(self):
+        db = SessionLocal()
+        try:
+            spans = load_generation_spans(db)
+            print(f"Loaded generation spans for {len(spans.models)} models")
+            return spans
+        except Exception as e:
+            print(f"Error loading generation spans: {e}")
+            return None
+        finally:
+            db.close()
 
     def increment_runs_counter(self, source):
         db = SessionLocal()
@@ -84,6 +102,7 @@ class OlxAutoturismeSpider(scrapy.Spider):
                 print(f"   - {reason}: {count}")
         
         db = SessionLocal()
+        publish_spider_changes(db, self.data_version, self.started_at)
         try:
             stats = db.query(IncompleteDataStats).filter_by(source=self.name.split("_")[0]).first()
             if stats:
@@ -407,6 +426,7 @@ class OlxAutoturismeSpider(scrapy.Spider):
                         existing.price = price
                         existing.price_history = json.dumps(history)
                         existing.created_at = created_at
+                        self.data_version.changed(session)
                         session.commit()
                         print(f"Updated price for: {source_url}")
                     except Exception as e:
@@ -417,6 +437,8 @@ class OlxAutoturismeSpider(scrapy.Spider):
                 print(f"Duplicate ad: {source_url}")
                 return
 
+            generation = self.generation_spans.lookup(brand, model, year) if self.generation_spans else None
+
             car = CarListing(
                 title=title,
                 price=price,
@@ -443,11 +465,13 @@ class OlxAutoturismeSpider(scrapy.Spider):
                 right_hand_drive=right_hand_drive,
                 ad_created_at=ad_created_at,
                 vin=vin,
+                generation=generation,
                 battery_capacity=None,
                 range_km=None
             )
 
             session.add(car)
+            self.data_version.changed(session)
             session.commit()
             self.valid_cars += 1
             self.increment_valid_cars_counter("olx")
@@ -2,6 +2,8 @@ import scrapy
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.models import CarListing
+from app.crud.data_version_crud import ThrottledVersionBump
+from olx_scraper.db import publish_spider_changes
 from datetime import datetime
 import json
 from tqdm import tqdm # type: ignore
@@ -15,6 +17,8 @@ class UpdatePartialSpider(scrapy.Spider):
     def __init__(self):
         super().__init__()
         self.session: Session = SessionLocal()
+        self.data_version = ThrottledVersionBump()
+        self.started_at = datetime.now()
         self.last_id_path = "last_updated_id.txt"
         self.last_processed_id = self.load_last_processed_id()
         self.checked_cars = 0
@@ -112,6 +116,7 @@ class UpdatePartialSpider(scrapy.Spider):
             print(f"Anunt marcat ca vandut (404/410): {url}")
             
             try:
+                self.data_version.changed(self.session)
                 self.session.commit()
                 current_id = self.load_last_processed_id()
                 if car_id > current_id:
@@ -153,6 +158,7 @@ class UpdatePartialSpider(scrapy.Spider):
                 print(f"Anunt Autovit marcat ca vandut (pagina indisponibil): {url}")
                 
                 try:
+                    self.data_version.changed(self.session)
                     self.session.commit()
                     current_id = self.load_last_processed_id()
                     if car_id > current_id:
@@ -205,6 +211,7 @@ class UpdatePartialSpider(scrapy.Spider):
                 print(f"Anunt OLX marcat ca vandut (pagina indisponibil): {url}")
                 
                 try:
+                    self.data_version.changed(self.session)
                     self.session.commit()
                     current_id = self.load_last_processed_id()
                     if car_id > current_id:
@@ -275,6 +282,7 @@ class UpdatePartialSpider(scrapy.Spider):
                     
         try:
             if updated:
+                self.data_version.changed(self.session)
                 self.session.commit()
                 print(f"Modificari salvate pentru: {url}")
         except Exception as e:
@@ -297,6 +305,8 @@ class UpdatePartialSpider(scrapy.Spider):
         print(f"Blocaje Cloudflare: {self.cloudflare_blocks}")
         print("================================")
         
+        publish_spider_changes(self.session, self.data_version, self.started_at)
+        
         if "cloudflare" in reason.lower():
             print("Spider inchis din cauza blocajului Cloudflare.")
             return
@@ -27,7 +27,8 @@ export interface CarData {
     fuel_type: string;
     mileage: number;
     transmission: string;
-    images: string[] | string;
+    images?: string[] | string;
+    image?: string | null;
     engine_capacity?: number;
     engine_power?: number;
     sold?: boolean;
@@ -66,7 +67,7 @@ export const CarCard: React.FC<CarCardProps> = ({
     const t = useTranslations('carCard');
     const locale = useLocale();
     const [currentImageIndex, setCurrentImageIndex] = useState(0);
-    const images = parseImages(car.images);
+    const images = car.image ? [car.image] : parseImages(car.images ?? []);
     const currentImage = images[currentImageIndex] || "/default-car.webp";
 
     const handlePrevImage = (e: React.MouseEvent) => {
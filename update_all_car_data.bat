@@ -7,7 +7,7 @@ echo ========================================
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat"
 
 echo.
-echo Step 1/5: Running Autovit Scraper
+echo Step 1/6: Running Autovit Scraper
 echo ----------------------------------------
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper"
 set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend;C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper
@@ -17,7 +17,7 @@ scrapy crawl autovit_autoturisme
 call venv_scrapy\Scripts\deactivate
 
 echo.
-echo Step 2/5: Running OLX Scraper
+echo Step 2/6: Running OLX Scraper
 echo ----------------------------------------
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper"
 set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend;C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper
@@ -27,7 +27,7 @@ scrapy crawl olx_autoturisme
 call venv_scrapy\Scripts\deactivate
 
 echo.
-echo Step 3/5: Running Update Partial Data
+echo Step 3/6: Running Update Partial Data
 echo ----------------------------------------
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper"
 set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend;C:\Users\cosmi\Desktop\LICENTA\CarStat\backend\olx_scraper
@@ -51,20 +51,30 @@ if %errorlevel% equ 0 (
 
 call venv_scrapy\Scripts\deactivate
 
+rem The analytics scripts use the batch connection pool (no statement timeout, see backend\app\db_pool.py)
+set DB_PROFILE=batch
+
 echo.
-echo Step 4/5: Running Fill Missing Generations
+echo Step 4/6: Running Fill Missing Generations
 echo ----------------------------------------
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend"
 set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend
 python -m app.analytics.fill_missing_generations
 
 echo.
-echo Step 5/5: Running Update Deal Ratings
+echo Step 5/6: Running Update Deal Ratings
 echo ----------------------------------------
 cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend"
 set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend
 python -m app.analytics.update_deal_ratings
 
+echo.
+echo Step 6/6: Running Precompute Similar Listings
+echo ----------------------------------------
+cd /d "C:\Users\cosmi\Desktop\LICENTA\CarStat\backend"
+set PYTHONPATH=C:\Users\cosmi\Desktop\LICENTA\CarStat\backend
+python -m app.analytics.precompute_similar
+
 echo.
 echo Reset tracking files
 echo ----------------------------------------